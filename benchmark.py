@@ -0,0 +1,265 @@
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import platform
+import subprocess
+from datetime import datetime
+
+import pandas as pd
+
+from id_generator import IDGenerator, ID_COLUMNS
+
+
+# Benchmark of every stage of ID generation on synthetic data, works offline without credentials.json
+# Results are appended as json lines to benchmark_results.jsonl, so they can be compared between commits, ex.
+#   python benchmark.py --ids 30000 --rows 1000 10000 100000 --engine vectorized
+# --startup measures how long the GUI takes to start and to get cached ID file ready for the first search
+
+
+# Values used to build synthetic laptops, similar to the ones in M2 M47 file
+MODELS = [
+    ("Lenovo", "ThinkPad", ["T480", "T480s", "T490", "T14 Gen 1", "T14s Gen 2", "X280", "X390", "L480", "E14"]),
+    ("Lenovo", "ThinkBook", ["14 G2", "15 G2"]),
+    ("Lenovo", "Yoga", ["370", "X1"]),
+    ("HP", "ProBook", ["640 G4", "450 G5", "440 G6"]),
+    ("HP", "EliteBook", ["840 G5", "840 G6", "830 G5", "850 G5"]),
+    ("Dell", "Latitude", ["5490", "7490", "5400", "E5470", "7400"]),
+    ("Dell", "Precision", ["5530", "7530"]),
+]
+PROCESSORS = ["i5-8350U", "i5-8250U", "i7-8650U", "i5-8365U", "i5-10210U", "i7-10510U", "Ryzen 5 3500U", "Ryzen 5 PRO 4650U"]
+RAMS = [8, 16, 32]
+DISKS = [128, 256, 512]
+RESOLUTIONS = ['14" FHD', '15.6" Full HD', '14" HD', '13.3" FullHD', '12.5" HD', '14" WQHD', '15.6" FHD dotyk']
+GRAPHICS = ["GeForce MX150", "GeForce MX250", "Quadro P3200", "Radeon RX 540", "GeForce GTX 1050"]
+WINDOWS = ["W11P", "W11H"]
+CLASSES = ["A", "A-", "B", "C"]
+# Windows spellings used in reports for W11P and W11H
+WINDOWS_INPUT = {"W11P": ["Win11Pro", "W11P", "win11p"], "W11H": ["Win11Home", "W11H"]}
+
+
+def random_laptop(rnd):
+    manufacturer, family, models = rnd.choice(MODELS)
+    return {
+        "manufacturer": manufacturer,
+        "family": family,
+        "model": rnd.choice(models),
+        "processor": rnd.choice(PROCESSORS),
+        "ram": rnd.choice(RAMS),
+        "disk": "BRAK DYSKU" if rnd.random() < 0.8 else f"{rnd.choice(DISKS)}GB SSD",
+        "graphics": rnd.choice(GRAPHICS) if rnd.random() < 0.25 else None,
+        "resolution": rnd.choice(RESOLUTIONS),
+        "windows": rnd.choice(WINDOWS) if rnd.random() < 0.9 else None,
+        "class": rnd.choice(CLASSES),
+    }
+
+
+# 'Pełna nazwa' of laptop in M2 M47 format, ex. "Laptop Lenovo ThinkPad T480 / i5-8350U / 16GB / BRAK DYSKU / 14" FHD / W11P / Klasa A"
+# Some names have the same errors as the real file: missing manufacturer, processor with 'generacji' inside model, missing parts
+def catalogue_name(laptop, rnd):
+    quirk = rnd.random()
+    if laptop["family"] in ("ThinkPad", "ThinkBook", "Yoga", "ProBook", "EliteBook") and quirk < 0.3:
+        head = f"Laptop {laptop['family']} {laptop['model']}"
+    else:
+        head = f"Laptop {laptop['manufacturer']} {laptop['family']} {laptop['model']}"
+
+    if quirk > 0.97:
+        parts = [f"{head} i5 - 8 generacji", f"{laptop['ram']}GB", laptop["disk"]]
+    elif quirk > 0.96:
+        parts = [head, f"{laptop['ram']}GB", laptop["disk"]]
+    elif quirk > 0.955:
+        parts = [head, laptop["processor"]]
+    else:
+        parts = [head, laptop["processor"], f"{laptop['ram']}GB", laptop["disk"]]
+
+    if laptop["graphics"]:
+        parts.append(laptop["graphics"])
+    parts.append(laptop["resolution"])
+    if laptop["windows"]:
+        parts.append(laptop["windows"])
+    parts.append("Klasa " + laptop["class"])
+    return " / ".join(parts)
+
+
+# Synthetic 'Raw Date' sheet, laptops are returned too so reports can be built from them
+def generate_catalogue(size, seed=0):
+    rnd = random.Random(seed)
+    laptops = []
+    rows = []
+    for i in range(size):
+        # Many ID's share the same specs
+        if laptops and rnd.random() < 0.3:
+            laptop = rnd.choice(laptops)
+        else:
+            laptop = random_laptop(rnd)
+            laptops.append(laptop)
+        name = catalogue_name(laptop, rnd)
+        if rnd.random() < 0.01:
+            name = "Stacja dokująca " + name
+        rows.append({"ID": float(100000 + i), "Producent": laptop["manufacturer"], "Pełna nazwa": name, "Stan": rnd.randint(0, 20)})
+    return pd.DataFrame(rows), laptops
+
+
+# Synthetic input report, most laptops are from the catalogue, some have different values or are missing
+def generate_report(size, laptops, seed=1):
+    rnd = random.Random(seed)
+    rows = []
+    for i in range(size):
+        laptop = dict(rnd.choice(laptops)) if rnd.random() < 0.85 else random_laptop(rnd)
+        if rnd.random() < 0.2:
+            laptop.update({key: value for key, value in random_laptop(rnd).items() if key in ("ram", "class", "resolution")})
+        disk = laptop["disk"] if laptop["disk"] != "BRAK DYSKU" else f"{rnd.choice(DISKS)}GB SSD"
+        rows.append({
+            "Lp.": i + 1,
+            "S/N": f"PF{rnd.randrange(16 ** 6):06X}",
+            "Producent": laptop["manufacturer"],
+            "Model": f"{laptop['family']} {laptop['model']}" if rnd.random() < 0.99 else None,
+            "Procesor": laptop["processor"],
+            "Docelowa": f"{laptop['ram']}GB/{disk}",
+            "Grafika": laptop["graphics"] or "-",
+            "Wyświetlacz": laptop["resolution"].replace("Full HD", "FHD").replace("FullHD", "FHD"),
+            "Windows": rnd.choice(WINDOWS_INPUT[laptop["windows"]]) if laptop["windows"] else "brak",
+            "Klasa": laptop["class"],
+        })
+    return pd.DataFrame(rows)
+
+
+# Hash of current commit, results of different commits can be compared
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except Exception:
+        return None
+
+
+class Timer:
+    def __init__(self):
+        self.stages = {}
+
+    def run(self, stage, function, *args):
+        start = time.perf_counter()
+        result = function(*args)
+        self.stages[stage] = round(time.perf_counter() - start, 4)
+        return result
+
+
+def run_benchmark(ids, rows, engine, workers, hdd_switch, seed, work_dir):
+    dfRaw, laptops = generate_catalogue(ids, seed)
+    dfReport = generate_report(rows, laptops, seed + 1)
+    id_filename = os.path.join(work_dir, "raw_date.xlsx")
+    input_filename = os.path.join(work_dir, "raport.xlsx")
+    dfRaw.to_excel(id_filename, sheet_name="Raw Date", index=False)
+    dfReport.to_excel(input_filename, index=False)
+
+    generator = IDGenerator()
+    generator.cache_dir = os.path.join(work_dir, "cache")
+    generator.toggle_hdd_switch(hdd_switch)
+    generator.set_match_engine(engine)
+    generator.set_workers(workers)
+
+    timer = Timer()
+    dfID = timer.run("load_id", generator.read_excel_sheet, id_filename, "Raw Date", ID_COLUMNS)
+    dfInput = timer.run("load_input", generator.read_input, input_filename)
+    dfID = timer.run("clean", generator.clean_ID, dfID)
+    timer.run("index", generator.get_matcher if engine == "vectorized" else generator.get_index, dfID)
+    dfOutput, matches_found = timer.run("match", generator.match_ID, dfInput, dfID)
+    if isinstance(dfOutput, Exception):
+        raise dfOutput
+    timer.run("write", generator.write_output, dfOutput, generator.output_filename(input_filename, work_dir))
+
+    return {
+        "ids": ids,
+        "useful_ids": len(dfID),
+        "catalogue_mb": round(dfID.memory_usage(deep=True).sum() / 1024 ** 2, 2),
+        "rows": rows,
+        "found": matches_found,
+        "engine": engine,
+        "workers": workers,
+        "hdd_switch": hdd_switch,
+        "seconds": timer.stages,
+        "counters": generator.stats.counters,
+    }
+
+
+# Seconds needed to import module in new interpreter, the same as when program is started
+def import_time(module, work_dir):
+    code = f"import time; start = time.perf_counter(); import {module}; print(time.perf_counter() - start)"
+    env = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=work_dir, env=env, check=True)
+    return round(float(result.stdout.strip().splitlines()[-1]), 4)
+
+
+# Startup of the program: imports done before GUI window is shown, imports done in background and
+# IDGenerator.warm_up of ID file cleaned in previous run, then loading of the same file by the first search
+def run_startup_benchmark(ids, engine, seed, work_dir):
+    dfRaw, _ = generate_catalogue(ids, seed)
+    id_filename = os.path.join(work_dir, "raw_date.xlsx")
+    dfRaw.to_excel(id_filename, sheet_name="Raw Date", index=False)
+
+    # Previous run cleans ID file and saves it to cache
+    generator = IDGenerator()
+    generator.cache_dir = os.path.join(work_dir, "cache")
+    generator.load_ID(id_filename)
+    generator.prepare_ID()
+
+    timer = Timer()
+    timer.stages["import_gui"] = import_time("gui", work_dir)
+    timer.stages["import_id_generator"] = import_time("id_generator", work_dir)
+    generator = IDGenerator()
+    generator.cache_dir = os.path.join(work_dir, "cache")
+    generator.set_match_engine(engine)
+    if not timer.run("warm_up", generator.warm_up, id_filename):
+        raise RuntimeError("Cached ID file was not used")
+    timer.run("first_load", generator.load_ID, id_filename)
+
+    return {
+        "benchmark": "startup",
+        "ids": ids,
+        "engine": engine,
+        "seconds": timer.stages,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark of ID generation stages on synthetic data")
+    parser.add_argument("--ids", type=int, default=30000, help="number of rows in synthetic 'Raw Date' sheet")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000], help="sizes of synthetic reports")
+    parser.add_argument("--engine", choices=["loop", "vectorized"], default="loop")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--hdd", action="store_true", help="match ID's with specific HDD values")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--startup", action="store_true", help="measure startup of the program instead of matching")
+    parser.add_argument("--results", default="benchmark_results.jsonl", help="file results are appended to")
+    args = parser.parse_args(argv)
+
+    common = {
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+    }
+    work_dir = tempfile.mkdtemp(prefix="id_generator_benchmark_")
+    try:
+        with open(args.results, "a", encoding="utf-8") as file:
+            if args.startup:
+                result = dict(common, **run_startup_benchmark(args.ids, args.engine, args.seed, work_dir))
+                file.write(json.dumps(result) + "\n")
+                stages = ", ".join(f"{stage} {seconds:.3f} s" for stage, seconds in result["seconds"].items())
+                print(f"Startup with {args.ids} ID's ({args.engine}): {stages}")
+                return 0
+            for rows in args.rows:
+                result = dict(common, **run_benchmark(args.ids, rows, args.engine, args.workers, args.hdd, args.seed, work_dir))
+                file.write(json.dumps(result) + "\n")
+                stages = ", ".join(f"{stage} {seconds:.3f} s" for stage, seconds in result["seconds"].items())
+                print(f"{args.ids} ID's x {rows} rows ({args.engine}, {args.workers} workers): found {result['found']}; {stages}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+import numpy as np
+import pandas as pd
+
+from model_index import ModelIndex
+
+
+# Inverted index over cleaned ID file (output of IDGenerator.clean_ID)
+# Every distinct lowercased Manufacturer, Model and Processor value keeps positions of rows that hold it,
+# so searching for candidates tests only distinct values instead of every row of the ID file
+#
+# If grouped is True then rows with the same values of SIGNATURE (ID's of the same laptop) are one row of the index
+# Matching scores every such group once and self.expand turns it back into rows of all its ID's
+class CatalogueIndex:
+
+    # Normalized columns searched for Manufacturer, Model and Processor of input laptop
+    KEYS = ['manufacturer', 'model', 'processor']
+    # Columns of cleaned ID file used by MatchRules.normalize_catalogue, rows with the same values are matched the same way
+    SIGNATURE = ['Manufacturer', 'Model', 'Processor', 'RAM', 'HDD', 'Graphics', 'Resolution', 'Touchscreen', 'Windows', 'Class']
+
+    def __init__(self, dfID, rules, normalized=None, grouped=False):
+        # Index is valid only for this exact dataframe, IDGenerator rebuilds it when dfID changes
+        self.dfID = dfID
+        # Positions in dfID of rows of every group, None if index is not grouped
+        self.members = None
+        if grouped is True:
+            signatures = dfID.groupby(self.SIGNATURE, sort=False, dropna=False, observed=True).ngroup().to_numpy()
+            order = np.argsort(signatures, kind='stable')
+            bounds = np.searchsorted(signatures[order], np.arange(signatures.max() + 2 if len(signatures) else 1))
+            self.members = [order[bounds[i]:bounds[i + 1]] for i in range(len(bounds) - 1)]
+            self.ids = dfID['ID'].to_numpy()
+            # Groups are numbered in order of their first rows, so candidates keep order of dfID
+            normalized = rules.normalize_catalogue(dfID.iloc[[positions[0] for positions in self.members]])
+            normalized['ID'] = np.arange(len(self.members))
+        # Values of dfID prepared for matching by MatchRules.normalize_catalogue
+        self.normalized = rules.normalize_catalogue(dfID) if normalized is None else normalized
+
+        # {column: (distinct lowercased values, positions of rows for each value)}
+        self.values = {}
+        # {column: {searched value: positions of rows containing it}}
+        self.lookups = {}
+
+        for column in self.KEYS:
+            codes, uniques = pd.factorize(self.normalized[column])
+            order = np.argsort(codes, kind='stable')
+            bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+            positions = [order[bounds[i]:bounds[i + 1]] for i in range(len(uniques))]
+            self.values[column] = (list(uniques), positions)
+            self.lookups[column] = {}
+
+        # Models are matched by words unless rules use the old substring check
+        self.models = ModelIndex(self.values['model'][0], rules) if rules.model_matching == "tokens" else None
+        # {searched model: distinct models matching it}
+        self.model_matches = {}
+
+
+    # Returns index of new version of ID file, see IDGenerator.clean_ID_incremental
+    # previous_positions are positions in self.dfID of rows copied from it, -1 for new rows
+    # Only new rows are normalized, values of other rows are taken from this index
+    # Grouped index is built again, it normalizes only one row of every group anyway
+    def refresh(self, dfID, previous_positions, rules):
+        if self.members is not None:
+            return CatalogueIndex(dfID, rules, grouped=True)
+        kept = previous_positions >= 0
+        normalized = pd.concat([
+            self.normalized.iloc[previous_positions[kept]].set_axis(dfID.index[kept]),
+            rules.normalize_catalogue(dfID[~kept]),
+        ]).reindex(dfID.index)
+        return CatalogueIndex(dfID, rules, normalized)
+
+
+    # Returns positions in self.values[column] of distinct values matching searched value
+    # Values are matched if searched value is contained in them, models are matched by ModelIndex
+    def matching_values(self, column, value):
+        uniques, _ = self.values[column]
+        if column == 'model' and self.models is not None:
+            return self.models.lookup(value)
+        return [i for i, unique in enumerate(uniques) if value in unique]
+
+
+    # Checks if searched value matches given distinct value of column, the same way as self.lookup
+    def matches(self, column, value, unique):
+        if column != 'model' or self.models is None:
+            return value in unique
+        found = self.model_matches.get(value)
+        if found is None:
+            uniques, _ = self.values[column]
+            found = frozenset(uniques[i] for i in self.models.lookup(value))
+            self.model_matches[value] = found
+        return unique in found
+
+
+    # Returns sorted positions of rows where searched value matches value of given column
+    def lookup(self, column, value):
+        found = self.lookups[column].get(value)
+        if found is None:
+            uniques, positions = self.values[column]
+            found = [positions[i] for i in self.matching_values(column, value)]
+            found = np.sort(np.concatenate(found)) if found else np.empty(0, dtype=np.intp)
+            self.lookups[column][value] = found
+        return found
+
+
+    # Returns positions of rows (in dfID order) that match Manufacturer, Model and Processor of given laptop
+    # Only those rows can pass 'count < 3' check in IDGenerator.match_one
+    # Takes values returned by MatchRules.normalize_input_keys
+    def candidates(self, keys):
+        found = None
+        for column, value in zip(self.KEYS, keys):
+            positions = self.lookup(column, value)
+            found = positions if found is None else np.intersect1d(found, positions, assume_unique=True)
+        return found
+
+
+    # Turns matches of groups (tuples like the ones of IDGenerator.match_one, with number of group instead of ID)
+    # into matches of all ID's of these groups, in order of dfID. Matches of index that is not grouped are returned as they are
+    def expand(self, matched):
+        if self.members is None or not matched:
+            return matched
+        rows = []
+        for match in matched:
+            for position in self.members[match[0]]:
+                rows.append((position, (self.ids[position],) + tuple(match[1:])))
+        rows.sort(key=lambda row: row[0])
+        return [row[1] for row in rows]
@@ -0,0 +1,65 @@
+import os
+import pickle
+import hashlib
+
+
+# 'Znalezione ID' of rows that couldn't be matched when checkpoint is used, they are skipped instead of stopping the report
+BAD_ROW = "błąd"
+
+
+# Hash of content of file, the same report saved again under the same name gets the same hash
+def file_hash(filename, block_size=1024 * 1024):
+    digest = hashlib.sha1()
+    with open(filename, "rb") as file:
+        for block in iter(lambda: file.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# Results of already matched rows of one report, saved to disk every interval rows by IDGenerator.match_rows_checkpointed
+# If matching is stopped (error, closed program), the next run of the same report matches only the remaining rows
+# key identifies report, catalogue and settings results were found with, saved results of different key are not used
+class Checkpoint:
+
+    def __init__(self, filename, key, interval=1000):
+        self.filename = filename
+        self.key = key
+        self.interval = interval
+        # {index of row of input file: 'Znalezione ID'}
+        self.results = {}
+        # {index of row of input file: best matches of the row}, only if IDGenerator.top_k is used
+        self.top = {}
+
+
+    # Reads results saved by previous run, returns True if they were found for the same key
+    def load(self):
+        try:
+            with open(self.filename, "rb") as file:
+                saved_key, results, top = pickle.load(file)
+        except Exception:
+            return False
+        if saved_key != self.key:
+            return False
+        self.results = results
+        self.top = top
+        return True
+
+
+    def update(self, indexes, values, top=None):
+        self.results.update(zip(indexes, values))
+        if top is not None:
+            self.top.update(zip(indexes, top))
+
+
+    # Saves results under temporary name and renames it, so checkpoint is never incomplete
+    def save(self):
+        os.makedirs(os.path.dirname(self.filename) or ".", exist_ok=True)
+        with open(self.filename + ".part", "wb") as file:
+            pickle.dump((self.key, self.results, self.top), file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(self.filename + ".part", self.filename)
+
+
+    # Removes checkpoint after output file of the report is written
+    def remove(self):
+        if os.path.exists(self.filename):
+            os.remove(self.filename)
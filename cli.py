@@ -0,0 +1,132 @@
+import os
+import sys
+import glob
+import time
+import argparse
+import multiprocessing
+
+from id_generator import IDGenerator, OUTPUT_FORMATS
+from service import ServiceClient
+from pipeline import run_pipeline
+
+
+# Command line version of the GUI for scheduled runs on machines without display
+# ID file is loaded and cleaned only once and then used for all given reports, ex.
+#   python cli.py --id "https://drive.google.com/file/d/<file id>/view" --output wyniki raporty/*.xlsx
+#   python cli.py --id cache/id_<file id>.parquet --output wyniki --hdd raporty
+# With --service reports are matched by running service.py instead of loading ID file here, ex.
+#   python cli.py --service http://127.0.0.1:8765 --output wyniki raporty
+
+
+# Returns list of input files from given files, folders and glob patterns
+def find_reports(paths):
+    reports = []
+    for path in paths:
+        if os.path.isdir(path):
+            found = sorted(glob.glob(os.path.join(path, "*.xlsx")) + glob.glob(os.path.join(path, "*.xls")))
+        else:
+            found = sorted(glob.glob(path)) or [path]
+        # Skip output files if reports and output share a folder
+        reports += [report for report in found if not report.endswith("_znalezione.xlsx") and report not in reports]
+    return reports
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Vedion ID-generator, matches laptops from reports with ID's from M2 M47 file")
+    parser.add_argument("reports", nargs="+", help="report files, folders with reports or glob patterns")
+    parser.add_argument("--id", dest="id_source", action="append", help="link to M2 M47 file on Drive, local .xlsx file or cleaned ID file (.parquet, .pkl, .csv), can be given many times to match with many ID files at once")
+    parser.add_argument("--service", metavar="URL", help="send reports to matching service (service.py) instead of loading ID file")
+    parser.add_argument("--output", required=True, help="folder for output files")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default="xlsx", help="format of output files")
+    parser.add_argument("--dump-id", metavar="FILE", help="save cleaned ID file to this .csv file")
+    parser.add_argument("--hdd", action="store_true", help="match ID's with specific HDD values, same as 'ID z dyskami' in GUI")
+    parser.add_argument("--engine", choices=["loop", "vectorized"], default="loop", help="matching engine, see IDGenerator.match_engine")
+    parser.add_argument("--workers", type=int, default=1, help="number of processes used for matching")
+    parser.add_argument("--cache-size", type=int, default=50000, help="number of matched laptop configurations kept in memory, 0 turns cache off")
+    parser.add_argument("--persist-cache", action="store_true", help="save matched configurations in cache folder and use them in next runs")
+    parser.add_argument("--stream", choices=["auto", "yes", "no"], default="auto", help="match .xlsx reports in chunks of rows, 'auto' streams only big files")
+    parser.add_argument("--chunk-size", type=int, default=10000, help="number of rows in one chunk of streamed report")
+    parser.add_argument("--prefetch", type=int, default=2, help="number of reports parsed in advance while another one is matched")
+    parser.add_argument("--checkpoint-rows", type=int, default=1000, help="save matched rows every this many rows so an interrupted report can be resumed, 0 turns it off")
+    parser.add_argument("--top-k", type=int, default=0, help="add columns with this many best ID's of every laptop and their unmatched values")
+    parser.add_argument("--no-row-log", action="store_true", help="don't write every matched laptop to output.log")
+    args = parser.parse_args(argv)
+    if not args.id_source and not args.service:
+        parser.error("one of --id or --service is required")
+    if args.prefetch < 1:
+        parser.error("--prefetch has to be at least 1")
+    return args
+
+
+# Matches reports with running service.py, ID file is already loaded there
+def run_with_service(args, generator, reports):
+    client = ServiceClient(args.service)
+    try:
+        status = client.status()
+    except Exception as e:
+        print(f"Cannot connect to service: {e}", file=sys.stderr)
+        return 1
+    print(f"Service: {status['ids']} ID's, refreshed at {status['refreshed_at']}")
+
+    failed = 0
+    for report in reports:
+        start = time.perf_counter()
+        try:
+            output_name = generator.output_filename(report, args.output)
+            matches_found = client.match_report(report, output_name, args.hdd, args.format)
+        except Exception as e:
+            failed += 1
+            print(f"{report}: error: {e}", file=sys.stderr)
+            continue
+        print(f"{report}: found {matches_found} ID's, {time.perf_counter() - start:.2f} s -> {output_name}")
+
+    print(f"Reports: {len(reports) - failed} done, {failed} failed")
+    return 1 if failed else 0
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    generator = IDGenerator()
+    generator.toggle_hdd_switch(args.hdd)
+    generator.set_match_engine(args.engine)
+    generator.set_workers(args.workers)
+    generator.set_log_rows(not args.no_row_log)
+    generator.set_output_format(args.format)
+    generator.set_top_k(args.top_k)
+    generator.set_checkpoint_rows(args.checkpoint_rows)
+    generator.set_match_cache(args.cache_size, args.persist_cache)
+    generator.set_ID_dump_filename(args.dump_id)
+    generator.set_stream_input({"auto": None, "yes": True, "no": False}[args.stream], args.chunk_size)
+
+    reports = find_reports(args.reports)
+    if not reports:
+        print("No reports found", file=sys.stderr)
+        return 1
+    os.makedirs(args.output, exist_ok=True)
+    if args.service:
+        return run_with_service(args, generator, reports)
+
+    # ID file is loaded while the first reports are parsed, see pipeline.run_pipeline
+    start = time.perf_counter()
+    failed = 0
+    try:
+        for result in run_pipeline(generator, args.id_source, reports, args.output, args.prefetch):
+            if result.error is not None:
+                failed += 1
+                print(f"{result.report}: error: {result.error}", file=sys.stderr)
+                continue
+            rows = "" if result.rows is None else f" of {result.rows}"
+            print(f"{result.report}: found {result.matches_found}{rows} ID's, {result.seconds:.2f} s -> {result.output_name}")
+        if args.dump_id:
+            generator.dfID.to_csv(args.dump_id, index=False)
+    except Exception as e:
+        print(f"Cannot load ID file: {e}", file=sys.stderr)
+        return 1
+
+    print(f"Reports: {len(reports) - failed} done, {failed} failed, {time.perf_counter() - start:.2f} s ({generator.stats.summary()})")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
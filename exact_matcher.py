@@ -0,0 +1,113 @@
+import numpy as np
+
+from match_rules import NUMBER
+
+
+# Finds perfect matches of many laptops at once, before they are scored one by one by IDGenerator.match_one
+# Rows of cleaned ID file are grouped by key of values they are matched with, laptops with the same key
+# (lowercased Manufacturer, Model, Processor, Grafika, Wyświetlacz, Klasa, RAM, touchscreen and Windows tokens)
+# are joined with these groups by dictionary lookup
+#
+# Values are matched by containment, so rows with different key can be perfect matches too, ex. processor 'i5' of 'i5-8350u'
+# A key is used only if no row outside of its group matches all of its values ("closed" key), otherwise laptop is scored as before
+class ExactMatcher:
+
+    def __init__(self, index, rules):
+        # Matcher is valid only for dfID of given CatalogueIndex, IDGenerator rebuilds it when dfID changes
+        self.dfID = index.dfID
+        self.index = index
+        self.rules = rules
+        normalized = index.normalized
+        self.ids = normalized['ID'].to_numpy()
+        self.hdd = normalized['hdd'].to_numpy()
+        self.hdd_missing = normalized['hdd_missing'].to_numpy(dtype=bool)
+        # Values compared by self.is_closed
+        self.columns = {column: normalized[column].to_numpy(dtype=object) for column in ['graphics', 'resolution', 'resolution_tokens', 'touchscreen', 'windows_tokens']}
+        self.ram = normalized['ram'].to_numpy()
+        self.lap_class = normalized['lap_class'].to_numpy(dtype=object)
+
+        # {key: positions of rows with that key}
+        self.groups = {}
+        keys = zip(normalized['manufacturer'], normalized['model'], normalized['processor'], normalized['ram'], normalized['graphics'],
+                   normalized['resolution'], normalized['touchscreen'], normalized['windows_tokens'], normalized['lap_class'])
+        for position, key in enumerate(keys):
+            self.groups.setdefault(key, []).append(position)
+        for key, positions in self.groups.items():
+            self.groups[key] = np.array(positions)
+        # {key: True if only rows of its group match all of its values}
+        self.closed = {}
+
+
+    # Columns of input file the keys are made of
+    INPUT_COLUMNS = ['Producent', 'Model', 'Procesor', 'Docelowa', 'Grafika', 'Wyświetlacz', 'Windows', 'Klasa']
+
+    # Keys of laptops from input file in the same order as keys of rows, None if values are missing or have wrong format
+    def input_keys(self, dfInput):
+        def lower(column):
+            return dfInput[column].map(lambda value: value.lower() if isinstance(value, str) else None)
+
+        display = lower('Wyświetlacz')
+        numbers = dfInput['Docelowa'].map(lambda value: NUMBER.findall(value) if isinstance(value, str) else [])
+        ram = numbers.map(lambda found: int(found[0]) if len(found) > 1 else None)
+        touchscreen = display.map(lambda value: None if value is None else ('Yes' if self.rules.is_touchscreen(value) else 'No'))
+        windows = lower('Windows')
+        windows_tokens = windows.map({value: self.rules.tokens(self.rules.windows_aliases, value, 1) for value in windows.dropna().unique()})
+
+        keys = []
+        values = zip(lower('Producent'), lower('Model'), lower('Procesor'), ram, lower('Grafika'), display, touchscreen, windows_tokens, lower('Klasa'))
+        for key in values:
+            # Laptops without Windows token never get all values matched
+            if any(value is None for value in key) or not isinstance(key[7], frozenset) or not key[7]:
+                key = None
+            keys.append(key)
+        return keys
+
+
+    # Checks if only rows with given key match all values of laptop with that key, Manufacturer, Model and Processor
+    # are searched with CatalogueIndex and the rest is compared the same way as in IDGenerator.match_one
+    def is_closed(self, key):
+        closed = self.closed.get(key)
+        if closed is None:
+            manufacturer, model, processor, ram, graphics, display, touchscreen, windows_tokens, lap_class = key
+            resolution_tokens = self.rules.tokens(self.rules.resolution_aliases, display, 1)
+            candidates = self.index.candidates((manufacturer, model, processor))
+            # RAM and class are compared for equality, so they are checked for all candidates at once
+            candidates = candidates[(self.ram[candidates] == ram) & (self.lap_class[candidates] == lap_class)]
+            candidates = np.setdiff1d(candidates, self.groups[key], assume_unique=True)
+            columns = self.columns
+            closed = True
+            for position in candidates.tolist():
+                if (graphics in columns['graphics'][position]
+                        and (display in columns['resolution'][position] or resolution_tokens & columns['resolution_tokens'][position])
+                        and touchscreen in columns['touchscreen'][position] and windows_tokens & columns['windows_tokens'][position]):
+                    closed = False
+                    break
+            self.closed[key] = closed
+        return closed
+
+
+    # Returns list with perfect matches of every laptop of dfInput, None for laptops that have to be scored by IDGenerator.match_one
+    # Matches are lists of tuples like the ones returned by match_one, with all values matched
+    # If hdd_switch is None HDD is never matched, so perfect match has 9 matched values instead of 10
+    def match(self, dfInput, hdd_switch):
+        # Laptops without some of the columns are left for match_one, it returns the error for them
+        if any(column not in dfInput.columns for column in self.INPUT_COLUMNS):
+            return [None] * len(dfInput)
+        results = []
+        for key, docelowa in zip(self.input_keys(dfInput), dfInput['Docelowa']):
+            if key is None or key not in self.groups or not self.is_closed(key):
+                results.append(None)
+                continue
+            positions = self.groups[key]
+            if hdd_switch is False:
+                positions = positions[self.hdd_missing[positions]]
+            elif hdd_switch is True:
+                hdd = int(NUMBER.findall(docelowa)[1])
+                positions = positions[self.hdd_missing[positions] | (self.hdd[positions] == hdd)]
+            if len(positions) == 0:
+                results.append(None)
+                continue
+            m_hdd = hdd_switch is not None
+            count = 9 + m_hdd
+            results.append(self.index.expand([(ID, count, True, True, True, True, m_hdd, True, True, True, True, True) for ID in self.ids[positions].tolist()]))
+        return results
@@ -2,8 +2,22 @@ import tkinter as tk
 from tkinter import filedialog, messagebox
 from tkinter import ttk
 import threading, queue
+import multiprocessing
+import logging
 
-from id_generator import *
+from instrumentation import ProgressEvent
+
+
+# Texts shown under progressbar for stages of IDGenerator
+STAGE_LABELS = {
+    "download": "Pobieranie ID",
+    "parse": "Wczytywanie plików",
+    "clean": "Czyszczenie ID",
+    "index": "Indeksowanie ID",
+    "match": "Wyszukiwanie ID",
+    "write": "Zapisywanie wyników",
+    "reports": "Raporty",
+}
 
 
 class GUI():
@@ -21,6 +35,8 @@ class GUI():
         self.config_filename = "config.cfg"
         
         self.hdd_switch = tk.BooleanVar()
+        # Value of self.hdd_switch for background thread, tkinter variables can be read only by main thread
+        self.hdd_switch_value = False
         
         # Open file buttons
         self.file1_button = ttk.Button(root, text="Odśwież", command=self.file1_button_callback)
@@ -69,12 +85,33 @@ class GUI():
         self.label_status = ttk.Label(root, text="")
         self.label_status.grid(row=6, column=1, padx=(0,40))
         
-        # Init IDGenerator
-        self.generator = IDGenerator()
+        # IDGenerator imports pandas and other big libraries, so it's created in background after the window is shown
+        # Cached ID file from the link in entry1 is loaded and indexed at the same time, see self.warm_up
+        self.generator = None
+        self.warm_up_error = None
+        self.warm_up_thread = threading.Thread(target=self.warm_up, args=(self.entry1.get(),), daemon=True)
+        self.warm_up_thread.start()
+
+
+    # Runs in background thread started by __init__
+    def warm_up(self, source):
+        try:
+            from id_generator import IDGenerator
+            generator = IDGenerator()
+        except Exception as e:
+            self.warm_up_error = e
+            return
+        generator.toggle_hdd_switch(self.hdd_switch_value)
+        try:
+            generator.warm_up(source)
+        except Exception as e:
+            logging.info(f"Cannot prepare ID file: {e}")
+        self.generator = generator
 
 
     def file1_button_callback(self):
-        self.generator.toggle_fID_changed()
+        if self.generator is not None:
+            self.generator.toggle_fID_changed()
 
     # Reads entry contents from a config
     def read_config(self):
@@ -102,16 +139,16 @@ class GUI():
             file.writelines(lines)
 
             
-    # Reads file path from input file
+    # Reads file paths of input files, many reports can be selected at once
     def open_file(self, button_id):
-        file_path = filedialog.askopenfilename(
-            title="Wybierz plik",
+        file_paths = filedialog.askopenfilenames(
+            title="Wybierz pliki",
             filetypes=(("MS Excel files", "*.xls *xlsx"), ("All files", "*.*"))
         )
-        if file_path:
-            self.file_paths[button_id] = file_path
+        if file_paths:
+            self.file_paths[button_id] = list(file_paths)
             if button_id == 1:
-                self.fill_entry2(file_path)
+                self.fill_entry2("; ".join(file_paths))
         else:
             # messagebox.showinfo("Nie wybrano pliku", "Nie wybrano pliku.")
             pass
@@ -123,15 +160,40 @@ class GUI():
             self.file_paths[2] = folder_path
             
     def search_button_callback(self):
+        # Searching starts after IDGenerator is ready, button is checked again every 50ms until then
+        if self.warm_up_thread.is_alive():
+            if str(self.search_button.cget("state")) != "disabled":
+                self.search_button.configure(state="disabled")
+                self.label_status.configure(text="Przygotowywanie ID")
+                self.progressbar.start(10)
+            root.after(50, self.search_button_callback)
+            return
+        if str(self.search_button.cget("state")) == "disabled":
+            self.search_button.configure(state="normal")
+            self.stop_progress()
+        if self.generator is None:
+            messagebox.showinfo("Error!", self.warm_up_error)
+            return
+        self.generator.toggle_hdd_switch(self.hdd_switch.get())
+        
         # Get link to google spreadsheet from enrtry1
         spreasheet_link = self.entry1.get()
-        # Open and read files then this function creates thread that search for ID's
-        self.read_files_thread(self.generator, spreasheet_link, self.file_paths[1], self.file_paths[2])
+        input_paths = self.file_paths[1] or [None]
+        if len(input_paths) > 1:
+            # Many reports are matched in one run, see IDGenerator.process_reports
+            self.reports_thread(self.generator, spreasheet_link, input_paths, self.file_paths[2])
+        else:
+            # Open and read files then this function creates thread that search for ID's
+            self.read_files_thread(self.generator, spreasheet_link, input_paths[0], self.file_paths[2])
         
     
+    # Nothing is logged until IDGenerator is created, logging to output.log is set up when id_generator is imported
+    # and logging.info called before that would send all messages of the session to console instead
     def hdd_switch_callback(self):
-        print(self.hdd_switch.get())
-        self.generator.toggle_hdd_switch(self.hdd_switch.get())
+        self.hdd_switch_value = self.hdd_switch.get()
+        if self.generator is not None:
+            logging.info(self.hdd_switch_value)
+            self.generator.toggle_hdd_switch(self.hdd_switch_value)
         
     # Makes a thread wchich runs functions from IDGenerator that search for ID's
     # It is non-blocking, queue with returned value is checked every 50ms
@@ -148,6 +210,20 @@ class GUI():
         root.after(50, self.check_result_search, generator_queue)
         
     
+    # Makes a thread which matches many reports, result is handled the same way as result of search_thread
+    def reports_thread(self, generator, spreasheet_link, file_paths, output_path):
+        generator_queue = queue.Queue() # return value queue
+        thread = threading.Thread(target=generator.process_reports, args=(generator_queue, spreasheet_link, file_paths, output_path,))
+        
+        # Starts the thread and progressbar
+        thread.start()
+        self.label_status.configure(text="Pobieranie ID")
+        self.progressbar.start(10)
+        
+        # Checks queue for returned vales every 50ms
+        root.after(50, self.check_result_search, generator_queue)
+        
+    
     def read_files_thread(self, generator, spreasheet_link, file_path1, file_path2):
         generator_queue = queue.Queue() # return value queue
         thread = threading.Thread(target=generator.read_files, args=(generator_queue, spreasheet_link, file_path1, file_path2,))
@@ -162,21 +238,56 @@ class GUI():
         root.after(50, self.check_result_read, generator_queue)
     
 
+    # Shows stage and progress sent by IDGenerator
+    # Progressbar is determinate when size of the stage is known, ex. number of laptops to match
+    def show_progress(self, event):
+        text = STAGE_LABELS.get(event.stage, event.stage)
+        if event.total:
+            if str(self.progressbar.cget("mode")) != "determinate":
+                self.progressbar.stop()
+                self.progressbar.configure(mode="determinate")
+            self.progressbar.configure(maximum=event.total, value=event.done)
+            text += f": {event.done}/{event.total}"
+            if event.eta is not None:
+                minutes, seconds = divmod(int(event.eta), 60)
+                text += f", pozostało {minutes:02d}:{seconds:02d}"
+        elif str(self.progressbar.cget("mode")) != "indeterminate":
+            self.progressbar.configure(mode="indeterminate", value=0)
+            self.progressbar.start(10)
+        self.label_status.configure(text=text)
+    
+    
+    # Returns the last value from the queue, ProgressEvents before it are shown
+    # Raises queue.Empty if there is only progress
+    def get_result(self, result_queue):
+        while True:
+            result = result_queue.get_nowait()
+            if isinstance(result, ProgressEvent):
+                self.show_progress(result)
+            else:
+                return result
+    
+    
+    # Stops progressbar and sets it back to its initial state
+    def stop_progress(self):
+        self.progressbar.stop()
+        self.progressbar.configure(mode="indeterminate", value=0)
+        self.label_status.configure(text="")
+    
+
     # Function to check and retrieve the result from the queue
     def check_result_search(self, result_queue):
         try:
-            err = result_queue.get_nowait()  # Try to get the result and update 
+            err = self.get_result(result_queue)  # Try to get the result and update 
             # If returned value is int then function finished properly and found ID's
             # Else there were error
             if isinstance(err, int):    
-                self.progressbar.stop()
-                self.label_status.configure(text="")
+                self.stop_progress()
                 msg = "Znaleziono " + str(err) + " ID"
                 messagebox.showinfo("Znaleziono", msg)  # Show how many ID's were found
                 return err
             else:   
-                self.progressbar.stop()
-                self.label_status.configure(text="")
+                self.stop_progress()
                 messagebox.showinfo("Error!", err)  #Show errors
                 return err
         except queue.Empty:
@@ -186,18 +297,16 @@ class GUI():
     # Function to check and retrieve the result from the queue
     def check_result_read(self, result_queue):
         try:
-            err = result_queue.get_nowait()  # Try to get the result and update 
+            err = self.get_result(result_queue)  # Try to get the result and update 
             # If returned value is int then function finished properly and found ID's
             # Else there were error
             if err is None:    
-                self.progressbar.stop()
-                self.label_status.configure(text="")
+                self.stop_progress()
                 # Finds ID's
                 self.search_thread(self.generator)
                 return err
             else:   
-                self.progressbar.stop()
-                self.label_status.configure(text="")
+                self.stop_progress()
                 messagebox.showinfo("Error!", err)  #Show errors
                 return err
         except queue.Empty:
@@ -230,7 +339,11 @@ class GUI():
         root.destroy()
 
 
-root = tk.Tk()
-gui = GUI(root)
-root.protocol("WM_DELETE_WINDOW", gui.on_close)
-root.mainloop()
\ No newline at end of file
+# Guard is needed because worker processes of IDGenerator.match_rows_parallel import this file on Windows
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    
+    root = tk.Tk()
+    gui = GUI(root)
+    root.protocol("WM_DELETE_WINDOW", gui.on_close)
+    root.mainloop()
\ No newline at end of file
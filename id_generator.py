@@ -1,10 +1,26 @@
 import re
+import os
+import json
+import heapq
+import hashlib
+import threading
+import importlib.util
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import numpy as np
 import pandas as pd
 
 import logging
 
-from googleapiclient.discovery import build
-from google.oauth2 import service_account
+from catalogue_index import CatalogueIndex
+from vectorized_matcher import VectorizedMatcher
+from exact_matcher import ExactMatcher
+from match_rules import MatchRules
+from instrumentation import Instrumentation
+from match_cache import MatchCache
+from checkpoint import Checkpoint, BAD_ROW, file_hash
+from pipeline import run_pipeline, load_catalogue
+from streaming import ExcelChunkReader, open_chunk_writer, write_frame, OUTPUT_FORMATS
 
 
 # Redirect print statements to logging
@@ -18,16 +34,77 @@ logging.basicConfig(filename="output.log", level=logging.INFO, format="%(asctime
 # Replace the default print function
 print = log_print
 
+# Columns of 'Raw Date' sheet used by IDGenerator.clean_ID
+ID_COLUMNS = ['ID', 'Producent', 'Pełna nazwa']
+# Separates many ID files given as one source, ex. in GUI entry, see IDGenerator.load_catalogues
+ID_SOURCE_SEPARATOR = ";"
+# Column of merged dfID with name of ID file every row comes from, it's added to output as well
+CATALOGUE_COLUMN = 'Katalog'
+# Columns of input file used by IDGenerator.match_ID and IDGenerator.match_one
+INPUT_COLUMNS = ['Lp.', 'S/N', 'Producent', 'Model', 'Procesor', 'Docelowa', 'Grafika', 'Wyświetlacz', 'Windows', 'Klasa']
+
+# Use calamine to read excel files if it is installed, it is much faster than openpyxl
+# Otherwise pandas picks default engine, openpyxl opens .xlsx files in read-only mode
+EXCEL_ENGINE = "calamine" if importlib.util.find_spec("python_calamine") else None
+
+# Columns extracted from 'Pełna nazwa' by IDGenerator.extract_specs
+SPECS_COLUMNS = ['Manufacturer', 'Model', 'Processor', 'RAM', 'HDD', 'Graphics', 'Resolution', 'Touchscreen', 'Windows', 'Class']
+
+# Order of values in tuples returned by IDGenerator.match_one
+MATCH_FIELDS = ['ID', 'count', 'manufacturer', 'model', 'processor', 'ram', 'hdd', 'gpu', 'resolution', 'touchscreen', 'windows', 'lap_class']
+
+# Polish names of fields scored after Manufacturer, Model and Processor, used in columns added by IDGenerator.add_top_matches
+FIELD_LABELS = {'ram': 'RAM', 'hdd': 'Dysk', 'gpu': 'Grafika', 'resolution': 'Rozdzielczość', 'touchscreen': 'Dotyk', 'windows': 'Windows', 'lap_class': 'Klasa'}
+
+# Input .xlsx files bigger than that are matched in chunks by IDGenerator.process_stream if IDGenerator.stream_input is None
+STREAM_MIN_SIZE = 20 * 1024 * 1024
+
+# Size of parts in which ID file is downloaded from Drive
+DOWNLOAD_CHUNK_SIZE = 4 * 1024 * 1024
+
+# Number of matched laptops logged at once by IDGenerator.match_rows, one write per row slowed matching down
+ROW_LOG_BUFFER = 500
+
+
+# Generator and cleaned ID file used by worker process of IDGenerator.match_rows_parallel
+worker_generator = None
+worker_dfID = None
+
+
+# Runs once in every worker process
+def init_match_worker(generator, dfID):
+    global worker_generator, worker_dfID
+    worker_generator = generator
+    worker_dfID = dfID
+    # Only main process sends progress to GUI
+    worker_generator.stats.listen(None)
+
+
+# Matches one chunk of laptops in worker process, exact are perfect matches of its laptops found by IDGenerator.match_exact
+# Returns result of IDGenerator.match_rows, counters of this chunk and cached results of its laptops
+def match_worker_chunk(dfChunk, exact=None):
+    worker_generator.stats.counters = {}
+    result = worker_generator.match_rows(dfChunk, worker_dfID, exact=exact)
+    cache = worker_generator.match_cache
+    entries = cache.select(cache.key(row, worker_generator.hdd_switch) for _, row in dfChunk.iterrows())
+    return result, worker_generator.stats.counters, entries
+
+
 class IDGenerator:
     
     def __init__(self):
         
         # All of the below values are explained in self.read_files
-        self.fInput = None
-        self.fID_keys = None
-        self.fInput_keys = None
         self.dfID = None
         self.dfInput = None
+        # Index of candidates for self.match_one, built for currently used cleaned dfID
+        self.dfID_index = None
+        # (dfID, {ID: names of ID files}) used for CATALOGUE_COLUMN of output, see self.catalogue_names
+        self.dfID_catalogues = None
+        # Precomputed arrays for self.match_one_vectorized, built for currently used cleaned dfID
+        self.dfID_matcher = None
+        # Groups of rows with the same values for self.match_exact, built for currently used cleaned dfID
+        self.dfID_exact = None
         
         self.fID_URL = None
         self.fInput_filename = None
@@ -35,12 +112,63 @@ class IDGenerator:
         
         # If searching is run multiple times this variable prevents cleaning ID file multiple times
         self.fID_changed = True
+        # True if dfID is already cleaned (ex. loaded from cache), so it doesn't need self.clean_ID
+        self.fID_cleaned = False
+        # Drive file ID and its revision (md5Checksum or modifiedTime), they identify cleaned ID file in cache
+        self.fID_file_id = None
+        self.fID_version = None
+        # Hashes of rows of raw 'Raw Date' sheet with positions of their cleaned rows in dfID, see self.ID_snapshot
+        self.fID_snapshot = None
+        # (file ID, cleaned dfID, snapshot) of previous version of ID file, it's used by self.prepare_ID to clean only changed rows
+        self.fID_previous = None
+        # {source: IDGenerator} of ID files merged into dfID if many of them are loaded at once, see self.load_catalogues
+        self.catalogues = {}
+        # Cleaned dfID of every source self.dfID was merged from, it's merged again only when any of them changes
+        self.catalogue_parts = None
+        # Folder with cleaned ID files, see self.read_cached_ID
+        self.cache_dir = "cache"
         # If this is true then match ID with specific HDD values, otherwise match only 'BRAK DYSKU'
         self.hdd_switch = False
+        # 'loop' scores candidates row by row in self.match_one, 'vectorized' scores entire dfID at once in self.match_one_vectorized
+        self.match_engine = "loop"
+        # Number of processes used by self.match_ID, 1 matches all laptops in this process
+        self.workers = 1
+        # Keywords and aliases used for cleaning and matching, can be changed in match_rules.json
+        self.rules = MatchRules.load()
+        # If this is true then cleaned dfID is stored in compact form, see self.compact_ID
+        self.compact_catalogue = True
+        # If this is true then ID's with the same cleaned values are scored once when matching, see CatalogueIndex
+        self.group_catalogue = True
+        # If this is true then all columns of input file are read and saved to output file, otherwise only INPUT_COLUMNS
+        self.read_all_input_columns = True
+        # True matches input file in chunks of self.chunk_size rows (see self.process_stream), False reads it at once,
+        # None streams only .xlsx files bigger than STREAM_MIN_SIZE
+        self.stream_input = None
+        self.chunk_size = 10000
+        # Format of output files, one of OUTPUT_FORMATS
+        self.output_format = "xlsx"
+        # Cleaned ID file is saved to this file after it's loaded, None doesn't save it
+        self.ID_dump_filename = "output_id_fromURL.csv"
+        # Results of already matched configurations of laptops, see self.match_cached
+        self.match_cache = MatchCache()
+        # If this is true then self.match_cache is saved in self.cache_dir and used again after restart
+        self.persist_match_cache = False
+        # If this is true then perfect matches are found for all laptops at once by self.match_exact before the rest is scored
+        self.exact_matching = True
+        # Matched laptops are saved to checkpoint every this many rows, so matching can be resumed after error, 0 turns it off
+        # Laptops that can't be matched are skipped when checkpoint is used, see self.match_rows_checkpointed
+        self.checkpoint_rows = 1000
+        # Number of best ID's with their unmatched values added to output for every laptop, 0 adds nothing, see self.add_top_matches
+        self.top_k = 0
+        # If this is true then every matched laptop is written to output.log, see self.match_rows
+        self.log_rows = True
+        # Times of stages and counters of the last run, progress is sent through result queue given to self.read_files and self.process_files
+        self.stats = Instrumentation()
         
+        # Drive client is built by self.get_drive_service when it's needed for the first time
         self.scopes = ["https://www.googleapis.com/auth/drive"]
-        self.credentials = service_account.Credentials.from_service_account_file("credentials.json", scopes=self.scopes)
-        self.drive_service = build("drive", "v3", credentials=self.credentials)
+        self.credentials = None
+        self.drive_service = None
     
     def toggle_fID_changed(self):
         self.fID_changed = True
@@ -50,6 +178,48 @@ class IDGenerator:
     def toggle_hdd_switch(self, value):
         self.hdd_switch = value
         
+        
+    def set_match_engine(self, value):
+        self.match_engine = value
+        
+        
+    def set_workers(self, value):
+        self.workers = max(1, int(value))
+        
+        
+    def set_log_rows(self, value):
+        self.log_rows = value
+        
+        
+    def set_match_cache(self, size, persist=None):
+        self.match_cache.max_size = max(0, int(size))
+        if persist is not None:
+            self.persist_match_cache = persist
+        
+        
+    def set_checkpoint_rows(self, value):
+        self.checkpoint_rows = max(0, int(value))
+        
+        
+    def set_top_k(self, value):
+        self.top_k = max(0, int(value))
+        
+        
+    def set_output_format(self, value):
+        if value not in OUTPUT_FORMATS:
+            raise ValueError(f"Unknown output format: {value}")
+        self.output_format = value
+        
+        
+    def set_ID_dump_filename(self, value):
+        self.ID_dump_filename = value
+        
+        
+    def set_stream_input(self, value, chunk_size=None):
+        self.stream_input = value
+        if chunk_size is not None:
+            self.chunk_size = max(1, int(chunk_size))
+        
       
     # Open and read files, returns values to be handled by GUI
     def read_files(self, result_queue, fID_URL, fInput_filename, fOutput_filename):
@@ -62,101 +232,646 @@ class IDGenerator:
         self.fInput_filename = fInput_filename
         self.fOutput_filename = fOutput_filename
         
+        # Stages are sent to GUI as ProgressEvent before the final value
+        self.stats.reset()
+        self.stats.listen(result_queue)
+        
         # Read excel files with ID data and file to format and generate IDs
         if self.fID_changed is True:
             try:
-                # Extract file ID from the link
-                file_id = fID_URL.split("/d/")[1].split("/")[0]
-
-                file_name = "fetched_id.xlsx"
-                # Download the file
-                request = self.drive_service.files().get_media(fileId=file_id)
-                with open(file_name, "wb") as f:
-                    f.write(request.execute())
-                    
-                # Read downloaded excel file
-                try:
-                    self.fID = pd.read_excel(file_name, sheet_name=None)
-                except Exception as e:
-                    print(f"Cannot open file: {e}")
-                    result_queue.put(e)
-                    return
-                
-                # Sheet with relevant data
-                self.dfID = self.fID['Raw Date']
-                
+                self.load_ID(fID_URL)
             except Exception as e:
-                print(f"Cannot download file: {e}")
+                self.stats.listen(None)
                 result_queue.put(e)
                 return
             
+        # Only first sheet of input file has relevant data
+        # Big files are read later in chunks by self.process_stream
         try:
-            self.fInput = pd.read_excel(fInput_filename, sheet_name=None)
+            self.dfInput = None if self.should_stream(fInput_filename) else self.read_input(fInput_filename)
         except Exception as e:
             print(f"Cannot open file: {e}")
+            self.stats.listen(None)
             result_queue.put(e)
             return
         
-        # Sheets with relevant data
-        self.fInput_keys = list(self.fInput.keys())
-        self.dfInput = self.fInput[self.fInput_keys[0]]
-        
+        self.stats.listen(None)
         result_queue.put(None)
         return
+    
+    
+    # Drive client is built on first use, so ID files from disk can be used without credentials
+    # Google libraries are imported here too, they take long to import and are not needed for files from disk
+    def get_drive_service(self):
+        if self.drive_service is None:
+            from googleapiclient.discovery import build
+            from google.oauth2 import service_account
+            self.credentials = service_account.Credentials.from_service_account_file("credentials.json", scopes=self.scopes)
+            self.drive_service = build("drive", "v3", credentials=self.credentials)
+        return self.drive_service
+    
+    
+    # Loads ID file from link to Drive or from local file, see self.fetch_ID and self.read_local_ID
+    # Cleaned dfID loaded before is kept until self.prepare_ID, so only changed rows of new version have to be cleaned
+    # If the same revision of the file is already loaded and cleaned, it's kept as it is
+    # Many ID files separated by ID_SOURCE_SEPARATOR (or list of them) are loaded and merged by self.load_catalogues
+    def load_ID(self, source):
+        sources = self.split_sources(source)
+        if len(sources) > 1:
+            self.load_catalogues(sources)
+            return
+        if sources:
+            source = sources[0]
+        self.catalogues = {}
+        self.catalogue_parts = None
+        
+        dfLoaded = self.dfID
+        if self.fID_cleaned is True and self.fID_snapshot is not None:
+            self.fID_previous = (self.fID_file_id, self.dfID, self.fID_snapshot)
+        
+        if "/d/" in source:
+            self.fetch_ID(source)
+        else:
+            self.read_local_ID(source)
+        
+        if self.dfID is dfLoaded and self.fID_cleaned is True:
+            self.fID_previous = None
+            return
+        self.fID_snapshot = None
+        if self.fID_cleaned is True and self.fID_file_id is not None:
+            self.fID_snapshot = self.read_cached_snapshot(self.fID_file_id)
+    
+    
+    # Returns list of ID files given as one text separated by ID_SOURCE_SEPARATOR or as list
+    def split_sources(self, source):
+        if isinstance(source, str):
+            source = source.split(ID_SOURCE_SEPARATOR)
+        return [part.strip() for part in source if part and part.strip()]
+    
+    
+    # Loads many ID files, ex. catalogues of different warehouses, and merges them into one cleaned dfID
+    # Every file is loaded and cleaned by its own IDGenerator in separate thread, so downloads and parsing of files overlap
+    # Cache of cleaned files and incremental cleaning work for every file the same way as for one file
+    # Name of file every row comes from is kept in CATALOGUE_COLUMN, so laptops are matched with all files at once
+    def load_catalogues(self, sources):
+        catalogues = {source: self.catalogues.get(source) or self.catalogue_generator() for source in sources}
+        with ThreadPoolExecutor(max_workers=len(catalogues)) as executor:
+            loading = [executor.submit(self.load_catalogue_source, catalogue, source) for source, catalogue in catalogues.items()]
+            for future in loading:
+                future.result()
+        self.catalogues = catalogues
+        
+        parts = [catalogue.dfID for catalogue in catalogues.values()]
+        if self.catalogue_parts is not None and self.dfID is not None and len(parts) == len(self.catalogue_parts) and all(part is previous for part, previous in zip(parts, self.catalogue_parts)):
+            return
+        with self.stats.stage("clean"):
+            self.dfID = self.merge_catalogues(catalogues)
+        self.catalogue_parts = parts
+        self.fID_cleaned = True
+        self.fID_snapshot = None
+        self.fID_previous = None
+        
+        # Merged dfID is identified by its files, so match results can be cached for it like for one file
+        file_ids = [catalogue.fID_file_id for catalogue in catalogues.values()]
+        versions = [catalogue.fID_version for catalogue in catalogues.values()]
+        if None in file_ids or None in versions:
+            self.fID_file_id = None
+            self.fID_version = None
+        else:
+            self.fID_file_id = "multi_" + hashlib.sha1("|".join(file_ids).encode("utf-8")).hexdigest()[:16]
+            self.fID_version = "|".join(versions)
+    
+    
+    # Loads and cleans one of many ID files, runs in background thread of self.load_catalogues
+    # Stages and counters of the file are added to self.stats, its progress is sent to the same listener
+    def load_catalogue_source(self, catalogue, source):
+        catalogue.stats.reset()
+        catalogue.stats.listen(self.stats.listener)
+        try:
+            load_catalogue(catalogue, source)
+        except Exception as e:
+            print(f"Cannot load ID file {source}: {e}")
+            raise
+        finally:
+            catalogue.stats.listen(None)
+            self.stats.merge(catalogue.stats.counters)
+            for name, seconds in catalogue.stats.stages.items():
+                self.stats.stages[name] = self.stats.stages.get(name, 0.0) + seconds
+    
+    
+    # IDGenerator for one of many ID files, it uses the same rules and cache as this one
+    def catalogue_generator(self):
+        catalogue = IDGenerator()
+        catalogue.rules = self.rules
+        catalogue.cache_dir = self.cache_dir
+        catalogue.compact_catalogue = self.compact_catalogue
+        catalogue.ID_dump_filename = None
+        return catalogue
+    
+    
+    # Joins cleaned dfID of every ID file, CATALOGUE_COLUMN gets name of the file (see self.catalogue_name)
+    # ID's are not changed, ID found in more than one file is kept in every one of them, see self.catalogue_names
+    # Columns stored as categories by self.compact_ID are categories again after joining
+    # Files can have different columns, ex. .pkl file that wasn't compacted, missing values are left empty
+    def merge_catalogues(self, catalogues):
+        parts = [catalogue.dfID.assign(**{CATALOGUE_COLUMN: self.catalogue_name(source)}) for source, catalogue in catalogues.items()]
+        dfID = pd.concat(parts, ignore_index=True)
+        ids = dfID['ID'].astype(str)
+        shared = dfID[CATALOGUE_COLUMN].groupby(ids, observed=True).transform('nunique') > 1
+        if shared.any():
+            print("ID's found in more than one ID file: ", ids[shared].nunique())
+        if len({str(part['ID'].dtype) for part in parts}) > 1:
+            dfID['ID'] = ids
+        for column in dfID.columns:
+            if column == CATALOGUE_COLUMN or any(column in part.columns and isinstance(part[column].dtype, pd.CategoricalDtype) for part in parts):
+                dfID[column] = dfID[column].astype('category')
+        return dfID
+    
+    
+    # Name of ID file shown in CATALOGUE_COLUMN: name of local file without extension or file ID from link to Drive
+    def catalogue_name(self, source):
+        if "/d/" in source:
+            return source.split("/d/")[1].split("/")[0]
+        return os.path.splitext(os.path.basename(source))[0]
+    
+    
+    # Downloads ID file from Drive, sets self.dfID to raw 'Raw Date' sheet or to cleaned dfID from cache
+    # If Drive can't be reached (ex. offline), the last cleaned revision from cache is used
+    def fetch_ID(self, fID_URL):
+        try:
+            file_id = self.source_file_id(fID_URL)
+            
+            try:
+                with self.stats.stage("download"):
+                    # Ask Drive only for revision of the file, if it was already cleaned there is no need to download it
+                    metadata = self.get_drive_service().files().get(fileId=file_id, fields="md5Checksum,modifiedTime").execute()
+                version = metadata.get("md5Checksum") or metadata.get("modifiedTime")
+            except Exception as e:
+                version = self.cached_ID_version(file_id)
+                if version is None:
+                    raise
+                print(f"Cannot check revision of ID file, cached version {version} is used: {e}")
+            if self.is_loaded(file_id, version):
+                return
+            self.fID_file_id = file_id
+            self.fID_version = version
+            
+            self.dfID = self.read_cached_ID(self.fID_file_id, self.fID_version)
+            self.fID_cleaned = self.dfID is not None
+            if self.fID_cleaned is True:
+                return
+            
+            from googleapiclient.http import MediaIoBaseDownload
+            file_name = "fetched_id.xlsx"
+            # Download the file straight to disk in parts, so the whole file is never held in memory
+            with self.stats.stage("download"):
+                request = self.get_drive_service().files().get_media(fileId=file_id)
+                with open(file_name, "wb") as f:
+                    downloader = MediaIoBaseDownload(f, request, chunksize=DOWNLOAD_CHUNK_SIZE)
+                    done = False
+                    while done is False:
+                        status, done = downloader.next_chunk()
+                        if status is not None and status.total_size:
+                            self.stats.progress("download", status.resumable_progress, status.total_size)
+        except Exception as e:
+            print(f"Cannot download file: {e}")
+            raise
+        
+        # Read only sheet with relevant data from downloaded excel file
+        try:
+            self.dfID = self.read_excel_sheet(file_name, 'Raw Date', ID_COLUMNS)
+        except Exception as e:
+            print(f"Cannot open file: {e}")
+            raise
+    
+    
+    # Returns ID of file used to name its cache files: file ID from link to Drive or hash of path of local .xlsx file
+    # Cleaned ID files (.parquet, .pkl, .csv) are not cached, None is returned for them
+    def source_file_id(self, source):
+        if "/d/" in source:
+            return source.split("/d/")[1].split("/")[0]
+        if os.path.splitext(source)[1].lower() in [".parquet", ".pkl", ".csv"]:
+            return None
+        return "local_" + hashlib.sha1(os.path.abspath(source).encode("utf-8")).hexdigest()[:16]
+    
+    
+    # Prepares ID file for the first search while user picks files, ex. in background thread of GUI
+    # The last cleaned revision of given source is read from cache and index is built for it
+    # Nothing is downloaded, self.load_ID still checks revision of the file and keeps this one if it's the same
+    # Returns True if cached ID file was found
+    # Only one ID file is prepared, many of them are loaded by self.load_catalogues when searching starts
+    def warm_up(self, source):
+        if not source or self.dfID is not None or len(self.split_sources(source)) > 1:
+            return False
+        file_id = self.source_file_id(source)
+        version = None if file_id is None else self.cached_ID_version(file_id)
+        if version is None:
+            return False
+        dfID = self.read_cached_ID(file_id, version)
+        if dfID is None:
+            return False
+        self.dfID = dfID
+        self.fID_file_id = file_id
+        self.fID_version = version
+        self.fID_cleaned = True
+        self.fID_snapshot = self.read_cached_snapshot(file_id)
+        if self.match_engine == "vectorized":
+            self.get_matcher(dfID)
+        else:
+            self.get_index(dfID)
+        return True
+    
+    
+    # Takes cleaned dfID with its index and matcher from other IDGenerator that loaded and prepared it, ex. in background thread
+    # of service.MatchingService, so this one can match laptops while the other one loads the next revision
+    def use_catalogue_of(self, other):
+        if other.dfID is self.dfID:
+            return
+        self.dfID = other.dfID
+        self.fID_file_id = other.fID_file_id
+        self.fID_version = other.fID_version
+        self.fID_cleaned = other.fID_cleaned
+        self.fID_snapshot = other.fID_snapshot
+        self.fID_previous = None
+        self.dfID_index = other.dfID_index
+        self.dfID_matcher = other.dfID_matcher
+        self.dfID_exact = None
+        self.dfID_catalogues = None
+    
+    
+    # Checks if given revision of ID file is already loaded and cleaned
+    def is_loaded(self, file_id, version):
+        return self.fID_cleaned is True and self.dfID is not None and file_id == self.fID_file_id and version == self.fID_version
+    
+    
+    # Reads ID file from disk, sets self.dfID
+    # Excel files are M2 M47 files with 'Raw Date' sheet, their cleaned version is cached just like for Drive files
+    # .parquet, .pkl and .csv files are already cleaned ID files, ex. from cache folder or output_id_fromURL.csv
+    def read_local_ID(self, filename):
+        try:
+            extension = os.path.splitext(filename)[1].lower()
+            if extension in [".parquet", ".pkl", ".csv"]:
+                with self.stats.stage("parse"):
+                    if extension == ".parquet":
+                        self.dfID = pd.read_parquet(filename)
+                    elif extension == ".pkl":
+                        self.dfID = pd.read_pickle(filename)
+                    else:
+                        self.dfID = pd.read_csv(filename, dtype=str, keep_default_na=False)
+                        if self.compact_catalogue is True:
+                            self.dfID = self.compact_ID(self.dfID)
+                self.fID_file_id = None
+                self.fID_version = None
+                self.fID_cleaned = True
+                return
+            
+            # Local files are identified by their path, revision by time of modification and size
+            stat = os.stat(filename)
+            file_id = self.source_file_id(filename)
+            version = f"{stat.st_mtime_ns}-{stat.st_size}"
+            if self.is_loaded(file_id, version):
+                return
+            self.fID_file_id = file_id
+            self.fID_version = version
+            self.dfID = self.read_cached_ID(self.fID_file_id, self.fID_version)
+            self.fID_cleaned = self.dfID is not None
+            if self.fID_cleaned is False:
+                self.dfID = self.read_excel_sheet(filename, 'Raw Date', ID_COLUMNS)
+        except Exception as e:
+            print(f"Cannot open file: {e}")
+            raise
+    
+    
+    # Cleans loaded dfID if it wasn't cleaned yet and saves it to cache
+    # If previous version of the same ID file was cleaned before, only added and changed rows are cleaned
+    def prepare_ID(self):
+        if self.fID_cleaned is False:
+            previous = self.previous_ID(self.fID_file_id)
+            with self.stats.stage("clean"):
+                if previous is None:
+                    dfRaw = self.dfID
+                    self.dfID = self.clean_ID(dfRaw)
+                    self.fID_snapshot = self.ID_snapshot(dfRaw, self.dfID)
+                else:
+                    dfPrevious, snapshot = previous
+                    self.dfID, self.fID_snapshot, previous_positions = self.clean_ID_incremental(self.dfID, dfPrevious, snapshot)
+                    # Index of previous version is updated instead of built again
+                    if self.dfID_index is not None and self.dfID_index.dfID is dfPrevious:
+                        with self.stats.stage("index"):
+                            self.dfID_index = self.dfID_index.refresh(self.dfID, previous_positions, self.rules)
+            self.fID_cleaned = True
+            self.fID_previous = None
+            self.write_cached_ID(self.dfID, self.fID_file_id, self.fID_version, self.fID_snapshot)
+    
+    
+    # Returns (cleaned dfID, snapshot) of previous version of ID file, None if there is none
+    # It's taken from memory if the file was loaded before, otherwise from cache folder
+    def previous_ID(self, file_id):
+        if file_id is None:
+            return None
+        if self.fID_previous is not None and self.fID_previous[0] == file_id:
+            return self.fID_previous[1], self.fID_previous[2]
+        snapshot = self.read_cached_snapshot(file_id)
+        if snapshot is None:
+            return None
+        dfPrevious = self.read_cached_ID(file_id, None)
+        if dfPrevious is None:
+            return None
+        return dfPrevious, snapshot
+    
+    
+    # Reads first sheet of input file, it's the only one with relevant data
+    def read_input(self, fInput_filename):
+        return self.read_excel_sheet(fInput_filename, 0, None if self.read_all_input_columns else INPUT_COLUMNS)
+    
+    
+    # Checks if input file should be matched in chunks, only .xlsx files can be read in chunks
+    def should_stream(self, fInput_filename):
+        if not fInput_filename.lower().endswith(".xlsx"):
+            return False
+        if self.stream_input is None:
+            return os.path.getsize(fInput_filename) > STREAM_MIN_SIZE
+        return self.stream_input
+    
+    
+    # Matches input file in chunks of self.chunk_size rows and writes every matched chunk to output file
+    # Only one chunk of input and output is held in memory
+    # Returns number of found matches, raises error if any chunk couldn't be matched, output file is then left unchanged
+    def process_stream(self, fInput_filename, output_name, dfID):
+        reader = ExcelChunkReader(fInput_filename, self.chunk_size, None if self.read_all_input_columns else INPUT_COLUMNS)
+        checkpoint = self.open_checkpoint(fInput_filename, output_name, dfID)
+        writer = None
+        matches_found = 0
+        try:
+            for dfChunk in reader:
+                self.stats.count("chunks")
+                dfChunk, chunk_found = self.match_ID(dfChunk, dfID, progress=(dfChunk.index[0], reader.total), checkpoint=checkpoint)
+                if isinstance(dfChunk, Exception):
+                    raise dfChunk
+                matches_found += chunk_found
+                
+                with self.stats.stage("write"):
+                    if writer is None:
+                        writer = open_chunk_writer(output_name)
+                    writer.write(dfChunk)
+            
+            if writer is None:
+                raise ValueError(f"No rows in file: {fInput_filename}")
+            with self.stats.stage("write"):
+                writer.close()
+        except Exception:
+            if writer is not None:
+                writer.abort()
+            raise
+        if checkpoint is not None:
+            checkpoint.remove()
+        return matches_found
+    
+    
+    # Reads one sheet of excel file, if columns are given then other columns are skipped while parsing
+    def read_excel_sheet(self, filename, sheet_name, columns=None):
+        usecols = None if columns is None else (lambda column: column in columns)
+        with self.stats.stage("parse"):
+            return pd.read_excel(filename, sheet_name=sheet_name, usecols=usecols, engine=EXCEL_ENGINE)
         
         
     # Makes the job done, returns values to be handled by GUI
     # This funtion runs as a thread
     def process_files(self, result_queue):
+        self.stats.listen(result_queue)
         try:
-            if self.fID_changed is True:
-                self.dfID = self.clean_ID(self.dfID)
+            self.prepare_ID()
         except Exception as e:
+            self.stats.listen(None)
             result_queue.put(e)
             return 
         
         # Save the cleaned data to a new CSV file (optional)
         try:
-            if self.fID_changed is True:
-                self.dfID.to_csv('output_id_fromURL.csv', index=False)
+            if self.fID_changed is True and self.ID_dump_filename:
+                self.dfID.to_csv(self.ID_dump_filename, index=False)
         except Exception as e:
             print("Cannot save to file")
+            self.stats.listen(None)
             result_queue.put(e)
             return 
         
-        self.dfInput, matches_found = self.match_ID(self.dfInput, self.dfID)
+        output_name = self.output_filename(self.fInput_filename, self.fOutput_filename)
+        if self.dfInput is None:
+            # Input file is matched and saved chunk by chunk
+            try:
+                matches_found = self.process_stream(self.fInput_filename, output_name, self.dfID)
+            except Exception as e:
+                print(f"Cannot process file: {e}")
+                self.stats.listen(None)
+                result_queue.put(e)
+                return
+            print("Stages: ", self.stats.summary())
+            self.stats.listen(None)
+            result_queue.put(matches_found)
+            return
+        
+        checkpoint = self.open_checkpoint(self.fInput_filename, output_name, self.dfID)
+        self.dfInput, matches_found = self.match_ID(self.dfInput, self.dfID, checkpoint=checkpoint)
         if self.dfInput is KeyError:
             print("KeyError")
             result_queue.put(KeyError)
         
         # Save data with added found IDs
         try:
-            # Regex pattern to extract text before the extension .xls, xlsx
-            pattern = r"^(.*?)(?=\.\w{3,4}$)"
-            new_name = re.match(pattern, self.fInput_filename).group(1)
-            new_name = new_name.rsplit('/', 1)[-1]  # extract everything after the last '/'
-            output_name = self.fOutput_filename + "/" + new_name + "_znalezione.xlsx" # name with correct extension in specified output folder
-            self.dfInput.to_excel(output_name, index=False)
+            self.write_output(self.dfInput, output_name)
         except Exception as e:
             print(f"Cannot save to file: {e}")
+            self.stats.listen(None)
             result_queue.put(e)
             return
+        if checkpoint is not None:
+            checkpoint.remove()
         
+        print("Stages: ", self.stats.summary())
+        self.stats.listen(None)
         result_queue.put(matches_found)
         return
+    
+    
+    # Matches many input files with ID file in one run, returns values to be handled by GUI
+    # Loading of ID file, parsing, matching and saving of reports overlap, see pipeline.run_pipeline
+    # This funtion runs as a thread
+    def process_reports(self, result_queue, fID_URL, fInput_filenames, fOutput_filename):
+        self.fID_URL = fID_URL
+        self.fID_changed = False
+        self.stats.reset()
+        self.stats.listen(result_queue)
+        
+        matches_found = 0
+        errors = []
+        try:
+            for result in run_pipeline(self, fID_URL, fInput_filenames, fOutput_filename):
+                if result.error is None:
+                    matches_found += result.matches_found
+                    print(f"{result.report}: found {result.matches_found}, {result.seconds:.2f} s")
+                else:
+                    print(f"{result.report}: error: {result.error}")
+                    errors.append(f"{os.path.basename(result.report)}: {result.error}")
+        except Exception as e:
+            print(f"Cannot load ID file: {e}")
+            self.stats.listen(None)
+            result_queue.put(e)
+            return
+        
+        print("Stages: ", self.stats.summary())
+        self.stats.listen(None)
+        if errors:
+            result_queue.put(RuntimeError(f"Znaleziono {matches_found} ID, błędy:\n" + "\n".join(errors)))
+        else:
+            result_queue.put(matches_found)
+    
+    
+    # Returns checkpoint of matching of given input file saved next to its output file, None if self.checkpoint_rows is 0
+    # Results saved by previous run are used if input file, catalogue, self.hdd_switch and self.top_k are the same
+    def open_checkpoint(self, fInput_filename, output_name, dfID):
+        if self.checkpoint_rows <= 0:
+            return None
+        try:
+            key = (file_hash(fInput_filename), self.catalogue_version(dfID), self.hdd_switch, self.top_k)
+        except Exception as e:
+            print(f"Cannot use checkpoint: {e}")
+            return None
+        folder, name = os.path.split(output_name)
+        checkpoint = Checkpoint(os.path.join(folder, "~" + name + ".checkpoint"), key, self.checkpoint_rows)
+        if checkpoint.load():
+            print("Checkpoint used, rows already matched: ", len(checkpoint.results))
+        return checkpoint
+    
+    
+    # Identifies cleaned dfID and rules used for matching, dfID that doesn't come from known file is identified by its content
+    def catalogue_version(self, dfID):
+        version = self.match_cache_version(dfID)
+        if version is None:
+            content = hashlib.sha1(pd.util.hash_pandas_object(dfID, index=False).to_numpy().tobytes()).hexdigest()[:16]
+            version = f"{content}/{self.rules.fingerprint()}"
+        return version
+    
+    
+    # Name of output file for given input file, it's saved in output folder with '_znalezione' added to the name
+    def output_filename(self, fInput_filename, fOutput_filename):
+        # Regex pattern to extract text before the extension .xls, xlsx
+        pattern = r"^(.*?)(?=\.\w{3,4}$)"
+        new_name = re.match(pattern, fInput_filename).group(1)
+        new_name = re.split(r"[\\/]", new_name)[-1]  # extract everything after the last '/' or '\'
+        return fOutput_filename + "/" + new_name + "_znalezione." + self.output_format # name with correct extension in specified output folder
+    
+    
+    # Saves data with added found IDs, format is chosen by extension of output_name
+    # File is written under temporary name and renamed when it's complete, see streaming.ChunkWriter
+    def write_output(self, df, output_name):
+        with self.stats.stage("write"):
+            write_frame(df, output_name)
+    
+    
+    # Returns paths of cached cleaned ID file and of its metadata
+    def cached_ID_paths(self, file_id):
+        path = os.path.join(self.cache_dir, "id_" + file_id)
+        return path, path + ".json"
+    
+    
+    # Returns cleaned dfID saved by self.write_cached_ID, None if there is none for this revision of Drive file
+    # If version is None then cached file of any revision is returned
+    # File cleaned with different rules is not used, see self.cached_ID_meta
+    def read_cached_ID(self, file_id, version):
+        path = self.cached_ID_paths(file_id)[0]
+        try:
+            meta = self.cached_ID_meta(file_id)
+            if meta is None or (version is not None and meta["version"] != version):
+                return None
+            if meta["format"] == "parquet":
+                df = pd.read_parquet(path + ".parquet")
+            else:
+                df = pd.read_pickle(path + ".pkl")
+        except Exception as e:
+            print(f"No cached ID file: {e}")
+            return None
+        print("Cached ID file used, version: ", version)
+        self.stats.count("cache_hits")
+        return df
+    
+    
+    # Returns revision of cached cleaned ID file, None if there is none
+    def cached_ID_version(self, file_id):
+        try:
+            return self.cached_ID_meta(file_id)["version"]
+        except Exception:
+            return None
+    
+    
+    # Returns metadata saved by self.write_cached_ID, None if cached file was cleaned with different rules
+    # Raises error if there is no metadata
+    def cached_ID_meta(self, file_id):
+        with open(self.cached_ID_paths(file_id)[1], "r") as file:
+            meta = json.load(file)
+        if meta.get("rules") != self.rules.fingerprint():
+            return None
+        return meta
+    
+    
+    # Returns snapshot saved with cached dfID by self.write_cached_ID, None if there is none or it was made with different rules
+    def read_cached_snapshot(self, file_id):
+        path = self.cached_ID_paths(file_id)[0] + ".rows.npz"
+        try:
+            with np.load(path) as data:
+                if str(data["rules"]) != self.rules.fingerprint():
+                    return None
+                return pd.Series(data["positions"], index=data["hashes"])
+        except Exception:
+            return None
+    
+    
+    # Saves cleaned dfID so it doesn't have to be downloaded and cleaned again until Drive file changes
+    # Parquet is used if pyarrow is installed and can store all the columns, pickle otherwise
+    # Snapshot is saved next to it, so the next version of the file can be cleaned incrementally after restart
+    def write_cached_ID(self, df, file_id, version, snapshot=None):
+        if file_id is None or version is None:
+            return
+        path, meta_path = self.cached_ID_paths(file_id)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            try:
+                df.to_parquet(path + ".parquet", index=False)
+                file_format = "parquet"
+            except Exception:
+                df.to_pickle(path + ".pkl")
+                file_format = "pickle"
+            if snapshot is not None:
+                np.savez(path + ".rows.npz", hashes=snapshot.index.to_numpy(), positions=snapshot.to_numpy(), rules=np.array(self.rules.fingerprint()))
+            elif os.path.exists(path + ".rows.npz"):
+                os.remove(path + ".rows.npz")
+            # Metadata is written last so incomplete cache is never used
+            with open(meta_path, "w") as file:
+                json.dump({"version": version, "format": file_format, "rules": self.rules.fingerprint()}, file)
+        except Exception as e:
+            print(f"Cannot save cached ID file: {e}")
             
      
     # Finds matches for one laptop in dfID
-    # Returns df with with all the matches
+    # Returns list of tuples with all the matches, values in tuples are ordered as in MATCH_FIELDS
     def match_one(self, input_row, dfID):
-        # Structure od output df witch matched ID
-        df_index = ['ID', 'count', 'manufacturer', 'model', 'processor', 'ram', 'hdd', 'gpu', 'resolution', 'touchscreen', 'windows', 'lap_class']
-        df_matched = pd.DataFrame(columns=df_index)
+        matched = []
+        index = self.get_index(dfID)
+        
+        # Only rows with matching Manufacturer, Model and Processor can pass 'count < 3' check, so get them from index
+        try:
+            manufacturer, model, processor = self.rules.normalize_input_keys(input_row)
+            candidates = index.candidates((manufacturer, model, processor))
+        except Exception as e:
+            return e
+        self.stats.count("candidates", len(candidates))
+        
+        # Other values of input laptop are normalized only if there is a candidate
+        specs = None
         
-        # Iterate dfID file by rows
-        for index, row in dfID.iterrows():
+        # Iterate candidate rows of dfID file, values of rows were normalized by self.rules when index was built
+        for row in index.normalized.iloc[candidates].itertuples(index=False):
             # temporary match variables. 0 if not matched, 1 if matched
-            m_id = 0
             count = 0
             m_manufacturer = False
             m_model = False
@@ -169,22 +884,19 @@ class IDGenerator:
             m_windows = False
             m_lap_class = False
             
-            # For debugging purposes
-            tID = int(row['ID'])
-            tIndex = int(input_row['Lp.'])
-            
             # Following if's search for matches for given laptop
             # Count matches and at the end return df row with boolean values of matched values
             try:
-                if input_row['Producent'].lower() in row['Manufacturer'].lower():
+                if manufacturer in row.manufacturer:
                     m_manufacturer = True
                     count += 1
                     
-                if input_row['Model'].lower() in row['Model'].lower():  # This is not ideal because some models wrongly match ex. T480 and T480s and silver versions of laptops
+                # Models are matched by words, so ex. T480 doesn't match T480s and silver versions of laptops, see ModelIndex
+                if index.matches('model', model, row.model):
                     m_model = True
                     count += 1
                 
-                if input_row['Procesor'].lower() in row['Processor'].lower():
+                if processor in row.processor:
                     m_processor = True
                     count += 1
                 
@@ -192,99 +904,351 @@ class IDGenerator:
                 if count < 3:
                     continue
                 
-                # Extract RAM and HDD values from input data
-                matches = re.findall(r'\d+', input_row['Docelowa'])
-                ram1 = matches[0]
-                hdd1 = matches[1]
+                # Extract RAM, HDD and other values from input data
+                if specs is None:
+                    specs = self.rules.normalize_input_specs(input_row)
                 
                 # Ignore all ID's that have specific HDD value. All ID's should only use 'BRAK DYSKU'  for reasons specific to company policy
                 # These ID's could have been removed during cleaning process in self.clean_ID but it was left for legacy
                 if self.hdd_switch is False:
-                    if 'BRAK DYSKU' in row['HDD']:
+                    if row.hdd_missing:
                         m_hdd = True
                         count += 1
                 elif self.hdd_switch is True:
-                    # Extract HDD values from string containing all sort of additional info
                     # Matching HDD values is legacy code because all actively used ID's have 'BRAK DYSKU' value for reasons specific to company policy
-                    hdd2 = re.search(r'\d+', row['HDD'])
-                    if hdd2:
-                        hdd2 = hdd2.group(0)
-                    if hdd1 == hdd2:
+                    if specs.hdd == row.hdd:
                         m_hdd = True
                         count += 1
-                    elif 'BRAK DYSKU' in row['HDD']: # if there is NO HDD in ID then there is a match no matter what
+                    elif row.hdd_missing: # if there is NO HDD in ID then there is a match no matter what
                         m_hdd = True
                         count += 1
                 
-                # Extract RAM values from string containing all sort of additional info
-                ram2 = re.search(r'\d+', row['RAM'])
-                if ram2:
-                    ram2 = ram2.group(0)
-                if ram1 == ram2:
+                if specs.ram == row.ram:
                     m_ram = True
                     count += 1
                     
-                if input_row['Grafika'].lower() in row['Graphics'].lower():
+                if specs.graphics in row.graphics:
                     m_gpu = True
                     count += 1
-                    
-                if input_row['Wyświetlacz'].lower() in row['Resolution'].lower():
-                    m_resolution = True
-                    count += 1
-                elif 'fhd' in input_row['Wyświetlacz'].lower() and any(keyword in row['Resolution'].lower() for keyword in ['fullhd', 'full hd']):
+                
+                # Resolutions also match if they have the same canonical token, ex. 'fhd' and 'full hd'
+                if specs.display in row.resolution or specs.resolution_tokens & row.resolution_tokens:
                     m_resolution = True
                     count += 1
                     
-                if 'dotyk' in input_row['Wyświetlacz'].lower() and 'Yes' in row['Touchscreen']:
-                    m_touchscreen = True
-                    count += 1
-                elif 'dotyk' not in input_row['Wyświetlacz'].lower() and 'No' in row['Touchscreen']:
+                if specs.touchscreen in row.touchscreen:
                     m_touchscreen = True
                     count += 1
-                    
-                if any(keyword in input_row['Windows'].lower() for keyword in ['win11pro', 'win11p', 'w11p']) and 'w11p' in row['Windows'].lower():
-                    m_windows = True
-                    count += 1
-                    
-                elif any(keyword in input_row['Windows'].lower() for keyword in ['win11home', 'win11h', 'w11h']) and 'w11h' in row['Windows'].lower():
+                
+                # Windows versions match if they have the same canonical token, ex. 'win11pro' and 'w11p'
+                if specs.windows_tokens & row.windows_tokens:
                     m_windows = True
                     count += 1
                     
-                if input_row['Klasa'].lower() == row['Class'].lower():
+                if specs.lap_class == row.lap_class:
                     m_lap_class = True
                     count += 1
                 
                 # If less than that is matched then laptop is to different to even show it    
                 if(count > 6):
-                    # Add new row to df_matched
-                    new_row = pd.Series([row['ID'], count, m_manufacturer, m_model, m_processor, m_ram, m_hdd, m_gpu, m_resolution, m_touchscreen, m_windows, m_lap_class], index=df_index)
-                    df_matched = pd.concat([df_matched, new_row.to_frame().T], ignore_index=True)
+                    matched.append((row.ID, count, m_manufacturer, m_model, m_processor, m_ram, m_hdd, m_gpu, m_resolution, m_touchscreen, m_windows, m_lap_class))
                     
             except Exception as e:
                 return e
                 
-        if not df_matched.empty:
-            return df_matched
+        # Groups of ID's with the same values are scored once, see CatalogueIndex.expand
+        if matched:
+            return index.expand(matched)
         else:
             return None
                 
     
+    # Returns self.top_k best of matches of one laptop returned by self.match_one, best first and rows with the same count in order of dfID
+    # Only matches with count > 6 are returned by match_one, so best ID's are chosen only from them
+    # Scoring with early termination is not used, matches scored for 'Znalezione ID' are reused and k best are picked with bounded heap
+    def top_matches(self, matched):
+        if not isinstance(matched, list):
+            return None
+        return heapq.nsmallest(self.top_k, matched, key=lambda match: -match[1])
+    
+    
+    # Adds columns with self.top_k best ID's of every laptop of dfCleaned returned by self.match_ID:
+    # 'ID n', 'Zgodność n' (number of matched values) and 'Niezgodne n' (values that are different), n is place from 1
+    # all_top has best matches of every laptop returned by self.match_rows, None for laptops without them
+    def add_top_matches(self, dfCleaned, all_top):
+        labels = [FIELD_LABELS[field] for field in MATCH_FIELDS[5:]]
+        columns = {}
+        for place in range(1, self.top_k + 1):
+            for name in ['ID', 'Zgodność', 'Niezgodne']:
+                columns[f"{name} {place}"] = []
+        
+        for matched in all_top:
+            matched = matched or []
+            for place in range(1, self.top_k + 1):
+                if place <= len(matched):
+                    match = matched[place - 1]
+                    columns[f"ID {place}"].append(str(match[0]))
+                    columns[f"Zgodność {place}"].append(match[1])
+                    columns[f"Niezgodne {place}"].append(', '.join(label for label, flag in zip(labels, match[5:]) if not flag))
+                else:
+                    columns[f"ID {place}"].append(None)
+                    columns[f"Zgodność {place}"].append(None)
+                    columns[f"Niezgodne {place}"].append(None)
+        
+        for name, values in columns.items():
+            dfCleaned[name] = pd.array(values, dtype="Int64") if name.startswith("Zgodność") else values
+    
+    
+    # Returns index of candidates for given dfID, builds it only when dfID has changed
+    def get_index(self, dfID):
+        if self.dfID_index is None or self.dfID_index.dfID is not dfID:
+            self.dfID_index = CatalogueIndex(dfID, self.rules, grouped=self.group_catalogue)
+        return self.dfID_index
+    
+    
+    # Returns matcher for self.match_one_vectorized, builds it only when dfID has changed
+    def get_matcher(self, dfID):
+        if self.dfID_matcher is None or self.dfID_matcher.dfID is not dfID:
+            self.dfID_matcher = VectorizedMatcher(self.get_index(dfID))
+        return self.dfID_matcher
+    
+    
+    # Finds matches for one laptop in dfID the same way as self.match_one, but scores all rows at once
+    def match_one_vectorized(self, input_row, dfID):
+        try:
+            return self.get_matcher(dfID).match(input_row, self.rules, self.hdd_switch, self.stats)
+        except Exception as e:
+            return e
+    
+    
+    # Finds matches for one laptop with self.match_engine
+    # Results of configurations matched before are taken from self.match_cache, errors are never cached
+    def match_cached(self, input_row, dfID):
+        key = self.match_cache.key(input_row, self.hdd_switch)
+        if key is not None:
+            found, matched = self.match_cache.get(key)
+            if found:
+                self.stats.count("match_cache_hits")
+                return matched
+        
+        if self.match_engine == "vectorized":
+            matched = self.match_one_vectorized(input_row, dfID)
+        else:
+            matched = self.match_one(input_row, dfID)
+        
+        if key is not None and not isinstance(matched, Exception):
+            self.match_cache.put(key, matched)
+        return matched
+    
+    
+    # Identifies cleaned dfID for self.match_cache, None if it's not known where it comes from
+    def match_cache_version(self, dfID):
+        if dfID is not self.dfID or self.fID_file_id is None or self.fID_version is None:
+            return None
+        return f"{self.fID_file_id}/{self.fID_version}/{self.rules.fingerprint()}"
+    
+    
+    # File self.match_cache is saved to if self.persist_match_cache is True
+    def match_cache_filename(self):
+        return os.path.join(self.cache_dir, "matches_" + self.fID_file_id + ".pkl")
+    
+    
+    # Prepares self.match_cache for given dfID, saved results are loaded if they were found for the same catalogue
+    def use_match_cache(self, dfID):
+        if self.match_cache.dfID is dfID:
+            return
+        version = self.match_cache_version(dfID)
+        self.match_cache.use(dfID, version)
+        if self.persist_match_cache is True and version is not None and not self.match_cache.entries:
+            if self.match_cache.load(self.match_cache_filename(), version):
+                print("Saved match results used: ", len(self.match_cache.entries))
+    
+    
     # Finds best matches for all laptops             
-    def match_ID(self, dfInput, dfID):
+    # progress is (number of rows before dfInput, number of all rows) if dfInput is a chunk of bigger file
+    # If checkpoint is given, results are saved to it while matching and laptops that can't be matched are skipped,
+    # see self.match_rows_checkpointed
+    def match_ID(self, dfInput, dfID, progress=None, checkpoint=None):
+        dfCleaned = dfInput.dropna(subset=['Model']).copy()
+        self.stats.count("rows", len(dfCleaned))
+        self.use_match_cache(dfID)
+        with self.stats.stage("index"):
+            if self.match_engine == "vectorized":
+                self.get_matcher(dfID)
+            else:
+                self.get_index(dfID)
+        with self.stats.stage("match"):
+            if checkpoint is not None:
+                result = self.match_rows_checkpointed(dfCleaned, dfID, progress, checkpoint)
+            else:
+                result = self.match_rows_exact(dfCleaned, dfID, progress)
+        if isinstance(result, Exception):
+            return result, result
+        all_matches, all_matches_count, all_top = result
+        
+        if self.persist_match_cache is True and self.match_cache.version is not None:
+            try:
+                self.match_cache.save(self.match_cache_filename())
+            except Exception as e:
+                print(f"Cannot save match results: {e}")
+
+        print("Found ID: ", all_matches_count)
+        if self.exact_matching is True:
+            print("Perfect matches found at once: ", self.stats.counters.get("exact_rows", 0), " Scored one by one: ", self.stats.counters.get("scored_rows", 0))
+        print("Match cache hits: ", self.match_cache.hits, " Hit rate: ", f"{self.match_cache.hit_rate():.0%}")
+        print("----------------------------------------------------------------------------------------\n")
+        dfCleaned['Znalezione ID'] = all_matches
+        if CATALOGUE_COLUMN in dfID.columns:
+            dfCleaned[CATALOGUE_COLUMN] = self.catalogue_names(all_matches, dfID)
+        if self.top_k > 0:
+            self.add_top_matches(dfCleaned, all_top)
+        return dfCleaned, all_matches_count # return final dataframe and how many matches were found
+    
+    
+    # Found ID's with names of ID files they come from, in the same order as in 'Znalezione ID', ex. 'wawa: 100102, krakow: 150023'
+    # Empty for laptops without found ID, ID's are read back from 'Znalezione ID' values made by self.match_rows
+    # ID found in more than one file is in 'Znalezione ID' once for every file it was matched in, in order of dfID,
+    # so it gets names of its files in that order. If it was matched in only some of them, names of all its files are given, ex. 'wawa/krakow: 100102'
+    def catalogue_names(self, all_matches, dfID):
+        if self.dfID_catalogues is None or self.dfID_catalogues[0] is not dfID:
+            names = {}
+            for ID, name in zip(dfID['ID'].astype(str), dfID[CATALOGUE_COLUMN].astype(str)):
+                names.setdefault(ID, []).append(name)
+            self.dfID_catalogues = (dfID, names)
+        names = self.dfID_catalogues[1]
+        
+        result = []
+        for value in all_matches:
+            if value in ('brak', BAD_ROW):
+                result.append("")
+                continue
+            IDs = value.removeprefix("Najbliższe: ").split(", ")
+            found = []
+            for place, ID in enumerate(IDs):
+                files = names.get(ID, [])
+                if len(files) == 1:
+                    found.append(f"{files[0]}: {ID}")
+                elif len(files) > 1 and IDs.count(ID) == len(files):
+                    found.append(f"{files[IDs[:place].count(ID)]}: {ID}")
+                elif files:
+                    found.append(f"{'/'.join(files)}: {ID}")
+                else:
+                    found.append(ID)
+            result.append(", ".join(found))
+        return result
+    
+    
+    # Matches laptops of dfCleaned with self.match_rows or self.match_rows_parallel, perfect matches are found first by self.match_exact
+    # executor is pool of worker processes from self.match_pool used by self.match_rows_parallel, if None it starts its own
+    def match_rows_exact(self, dfCleaned, dfID, progress=None, executor=None):
+        exact = self.match_exact(dfCleaned, dfID) if self.exact_matching is True else None
+        if self.workers > 1 and len(dfCleaned) > self.workers:
+            return self.match_rows_parallel(dfCleaned, dfID, progress, exact, executor)
+        return self.match_rows(dfCleaned, dfID, progress, exact)
+    
+    
+    # Same as self.match_rows_exact, but laptops are matched in parts of checkpoint.interval rows and results are saved
+    # to checkpoint after every part. Laptops found in checkpoint (matched by previous run of the same report) are not matched again
+    # Laptops that can't be matched are logged and get BAD_ROW, the rest of the report is matched anyway
+    # Returns KeyError if report doesn't have some of the columns needed for matching
+    def match_rows_checkpointed(self, dfCleaned, dfID, progress, checkpoint):
+        # Report without some of the columns can't be matched at all, its error is returned instead of skipping every laptop
+        missing = [column for column in ExactMatcher.INPUT_COLUMNS + ['S/N'] if column not in dfCleaned.columns]
+        if missing:
+            return KeyError(missing[0])
+        offset, total = self.progress_range(dfCleaned, progress)
+        restored = dfCleaned.index.isin(list(checkpoint.results))
+        if restored.any():
+            self.stats.count("restored_rows", int(restored.sum()))
+        dfPending = dfCleaned[~restored]
+        done = offset + int(restored.sum())
+        
+        # Worker processes are started once for all parts, so dfID and index are sent to them only once
+        executor = self.match_pool(dfID) if self.workers > 1 and len(dfPending) > self.workers else None
+        try:
+            for start in range(0, len(dfPending), checkpoint.interval):
+                dfPart = dfPending.iloc[start:start + checkpoint.interval]
+                try:
+                    result = self.match_rows_exact(dfPart, dfID, (done, total), executor)
+                except Exception as e:
+                    result = e
+                if isinstance(result, Exception):
+                    # Some laptop of this part is wrong, laptops are matched one by one to find it
+                    result = self.match_rows_skipping(dfPart, dfID)
+                checkpoint.update(dfPart.index, result[0], result[2])
+                try:
+                    checkpoint.save()
+                except Exception as e:
+                    print(f"Cannot save checkpoint: {e}")
+                done += len(dfPart)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        
+        all_matches = [checkpoint.results[index] for index in dfCleaned.index]
+        all_top = [checkpoint.top.get(index) for index in dfCleaned.index] if self.top_k > 0 else None
+        return all_matches, sum(1 for value in all_matches if value not in ('brak', BAD_ROW)), all_top
+    
+    
+    # Matches laptops one by one, laptops that can't be matched are logged and get BAD_ROW
+    def match_rows_skipping(self, dfCleaned, dfID):
         all_matches = []
         all_matches_count = 0
-        dfCleaned = dfInput.dropna(subset=['Model']).copy()
-        for index, row in dfCleaned.iterrows():
-            print(index, "\t", row['S/N'], end="\t")
+        all_top = [] if self.top_k > 0 else None
+        for position in range(len(dfCleaned)):
+            try:
+                result = self.match_rows_exact(dfCleaned.iloc[[position]], dfID)
+            except Exception as e:
+                result = e
+            if isinstance(result, Exception):
+                print(f"Row {dfCleaned.index[position]} skipped: {result!r}")
+                self.stats.count("bad_rows")
+                all_matches.append(BAD_ROW)
+                if all_top is not None:
+                    all_top.append(None)
+            else:
+                all_matches += result[0]
+                all_matches_count += result[1]
+                if all_top is not None:
+                    all_top += result[2]
+        return all_matches, all_matches_count, all_top
+    
+    
+    # Returns perfect matches of all laptops of dfCleaned found by ExactMatcher, None for laptops that have to be scored
+    def match_exact(self, dfCleaned, dfID):
+        if self.dfID_exact is None or self.dfID_exact.dfID is not dfID:
+            self.dfID_exact = ExactMatcher(self.get_index(dfID), self.rules)
+        return self.dfID_exact.match(dfCleaned, self.hdd_switch)
+    
+    
+    # Finds best matches for given laptops, returns list of found ID's, how many matches were found
+    # and list of self.top_k best matches of every laptop (see self.top_matches), None if self.top_k is 0
+    # exact is list of perfect matches of laptops returned by self.match_exact, laptops that have them are not scored,
+    # unless they have less than self.top_k perfect matches and the rest of best matches has to be scored
+    # Returns exception if any laptop couldn't be matched
+    # Matched laptops are logged in batches of ROW_LOG_BUFFER lines if self.log_rows is True
+    def match_rows(self, dfCleaned, dfID, progress=None, exact=None):
+        all_matches = []
+        all_matches_count = 0
+        all_top = [] if self.top_k > 0 else None
+        log_lines = []
+        offset, total = self.progress_range(dfCleaned, progress)
+        for done, (index, row) in enumerate(dfCleaned.iterrows(), offset + 1):
+            line = f"{index} \t {row['S/N']}"
             if(index >= 0):
-                matched = self.match_one(row, dfID)
-                if isinstance(matched, pd.DataFrame):
-                    max_matched = matched['count'].max()    # Best match with most matched values
-                    print("matches = ", max_matched, end=",\t")
-                    max_rows = matched[matched['count'] == max_matched] # All rows with the most amout of matches
-                    print("count = ", len(max_rows))
+                perfect = None if exact is None else exact[done - offset - 1]
+                if perfect is not None and len(perfect) >= self.top_k:
+                    matched = perfect
+                    self.stats.count("exact_rows")
+                else:
+                    matched = self.match_cached(row, dfID)
+                    self.stats.count("scored_rows")
+                if isinstance(matched, list):
+                    max_matched = max(match[1] for match in matched)    # Best match with most matched values
+                    max_rows = [match[0] for match in matched if match[1] == max_matched] # ID's of all rows with the most amout of matches
+                    line += f"\tmatches =  {max_matched},\tcount =  {len(max_rows)}"
                     # String composed of all ID from max_rows separated by ', '
-                    ID_matched = ', '.join(map(str, max_rows['ID'].tolist()))
+                    ID_matched = ', '.join(map(str, max_rows))
                     
                     # Only 9 or 10 matches are perfect matches
                     # Add info about non-perfect matches otherwise
@@ -295,32 +1259,120 @@ class IDGenerator:
                     all_matches_count += 1
                 elif matched is None:
                     all_matches.append('brak')
-                    print() # Print newline because ther is no newline at the end of -- print(index, row['S/N'], end=" ") --
                 else:
-                    return matched, matched
-                
-
-        print("Found ID: ", all_matches_count)
-        print("----------------------------------------------------------------------------------------\n")
-        dfCleaned['Znalezione ID'] = all_matches
-        return dfCleaned, all_matches_count # return final dataframe and how many matches were found
+                    self.flush_row_log(log_lines)
+                    return matched
+                if all_top is not None:
+                    all_top.append(self.top_matches(matched))
+            
+            if self.log_rows is True:
+                log_lines.append(line)
+                if len(log_lines) >= ROW_LOG_BUFFER:
+                    self.flush_row_log(log_lines)
+            self.stats.progress("match", done, total)
+        
+        self.flush_row_log(log_lines)
+        return all_matches, all_matches_count, all_top
+    
+    
+    # Returns (number of rows done before dfCleaned, number of all rows) used for progress of matching
+    # Total of chunked file is not known if its sheet has no dimensions, then rows done so far are used
+    def progress_range(self, dfCleaned, progress):
+        if progress is None:
+            return 0, len(dfCleaned)
+        offset, total = progress
+        return offset, max(total or 0, offset + len(dfCleaned))
+    
+    
+    # Writes buffered lines of self.match_rows to log as one entry
+    def flush_row_log(self, log_lines):
+        if log_lines:
+            print("\n".join(log_lines))
+            log_lines.clear()
+    
+    
+    # Same as self.match_rows, but laptops are split into chunks matched by self.workers processes
+    # Results are joined in the original order of laptops
+    # executor is pool from self.match_pool, it's started and closed here if None
+    def match_rows_parallel(self, dfCleaned, dfID, progress=None, exact=None, executor=None):
+        if executor is None:
+            with self.match_pool(dfID) as executor:
+                return self.match_rows_parallel(dfCleaned, dfID, progress, exact, executor)
+        
+        splits = np.array_split(np.arange(len(dfCleaned)), self.workers * 4)
+        chunks = [dfCleaned.iloc[positions] for positions in splits]
+        exact_chunks = [None if exact is None else [exact[position] for position in positions] for positions in splits]
+        results = []
+        done, total = self.progress_range(dfCleaned, progress)
+        # Chunks are returned in order, progress is sent after each of them
+        for chunk, (result, counters, entries) in zip(chunks, executor.map(match_worker_chunk, chunks, exact_chunks)):
+            results.append(result)
+            self.stats.merge(counters)
+            self.match_cache.update(entries)
+            done += len(chunk)
+            self.stats.progress("match", done, total)
+        
+        all_matches = []
+        all_matches_count = 0
+        all_top = [] if self.top_k > 0 else None
+        for result in results:
+            if isinstance(result, Exception):
+                return result
+            all_matches += result[0]
+            all_matches_count += result[1]
+            if all_top is not None:
+                all_top += result[2]
+        return all_matches, all_matches_count, all_top
+    
+    
+    # Starts self.workers processes for self.match_rows_parallel, they get this generator and dfID once when they start
+    def match_pool(self, dfID):
+        # Index and matcher are built before workers start, so they are not built again by every worker
+        # With 'fork' workers share them with this process instead of receiving a copy
+        self.get_index(dfID)
+        if self.match_engine == "vectorized":
+            self.get_matcher(dfID)
+        
+        # Forked process gets locks held by other threads (ex. of logging) and can wait for them forever,
+        # so 'fork' is used only if this is the only thread, ex. not in thread of GUI or next to threads of pipeline.run_pipeline
+        if "fork" in multiprocessing.get_all_start_methods() and threading.active_count() == 1:
+            context = multiprocessing.get_context("fork")
+        else:
+            context = multiprocessing.get_context("spawn")
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=context, initializer=init_match_worker, initargs=(self, dfID))
+    
+    
+    # Drive client can't be sent to worker processes of self.match_rows_parallel, workers don't need it
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for key in ['credentials', 'drive_service', 'dfInput', 'dfID_exact', 'catalogues', 'catalogue_parts', 'dfID_catalogues']:
+            state[key] = None
+        return state
               
               
-    def clean_ID(self, df):
+    # If vectorized is true then whole columns are processed at once by self.extract_specs_columns and self.format_specs_columns
+    # Otherwise every row is processed by self.extract_specs and self.format_specs, result is the same
+    def clean_ID(self, df, vectorized=True):
         # Number of rows of df before any formatting
         unformatted_len = len(df)
         
         # Remove rows containing the keyword "dokująca"
-        df = df[~df['Pełna nazwa'].str.contains('dokująca', case=False, na=False)]
+        df = df[~df['Pełna nazwa'].str.contains(self.rules.docking_keyword, case=False, regex=False, na=False)]
 
         # Apply the function to the "Specs" column to extract values from it
-        df[['Manufacturer', 'Model', 'Processor', 'RAM', 'HDD', 'Graphics', 'Resolution', 'Touchscreen', 'Windows', 'Class']] = df['Pełna nazwa'].apply(self.extract_specs)
+        if vectorized is True:
+            df = pd.concat([df, self.extract_specs_columns(df['Pełna nazwa'])], axis=1)
+        else:
+            df[SPECS_COLUMNS] = df['Pełna nazwa'].apply(self.extract_specs)
 
         # Drop the original "Specs" column and other non-important columns
         df = df.drop(columns=['Producent', 'Pełna nazwa'])
 
         # Addidtionaly format and fix errors that couldn't get fixed by extract_specs function
-        df = self.format_specs(df)
+        if vectorized is True:
+            df = self.format_specs_columns(df)
+        else:
+            df = self.format_specs(df)
 
         # Drop rows that didn't pass through extract_specs and format_specs because of all sort of formatting and data errors
         df = df[~df['Processor'].str.fullmatch("-")]
@@ -333,6 +1385,9 @@ class IDGenerator:
         df["ID"] = df["ID"].str.split('.').str[0]
 
         formatted_len = len(df)
+        
+        if self.compact_catalogue is True:
+            df = self.compact_ID(df)
 
         print("All matched IDs: ", unformatted_len)
         print("Useful IDs: ", formatted_len, " Deleted: ", unformatted_len - formatted_len)
@@ -341,6 +1396,73 @@ class IDGenerator:
         return df    
         
         
+    # Hash of every row of raw 'Raw Date' sheet, rows with the same ID and values have the same hash
+    def raw_row_hashes(self, dfRaw):
+        return pd.util.hash_pandas_object(dfRaw, index=False).to_numpy()
+    
+    
+    # Returns Series with hash of every row of dfRaw as index and position of its cleaned row in dfID as value,
+    # -1 for rows removed by self.clean_ID
+    # Every row is cleaned separately, so this is enough to clean the next version of the file by self.clean_ID_incremental
+    def ID_snapshot(self, dfRaw, dfID):
+        positions = np.full(len(dfRaw), -1, dtype=np.int64)
+        positions[dfRaw.index.get_indexer(dfID.index)] = np.arange(len(dfID))
+        snapshot = pd.Series(positions, index=self.raw_row_hashes(dfRaw))
+        return snapshot[~snapshot.index.duplicated()]
+    
+    
+    # Cleans new version of raw 'Raw Date' sheet using dfPrevious cleaned from the previous version
+    # Only added and changed rows go through self.clean_ID, other rows are copied from dfPrevious, deleted rows are dropped
+    # Result is the same as self.clean_ID(dfRaw), returns (cleaned dfID, its snapshot, positions of rows in dfPrevious or -1 for new rows)
+    def clean_ID_incremental(self, dfRaw, dfPrevious, snapshot):
+        hashes = self.raw_row_hashes(dfRaw)
+        known = snapshot.reindex(hashes).to_numpy()
+        new = np.isnan(known)
+        kept = ~new & (known >= 0)
+        kept_positions = known[kept].astype(np.int64)
+        
+        dfKept = dfPrevious.iloc[kept_positions].set_axis(dfRaw.index[kept])
+        if new.any():
+            dfNew = self.clean_ID(dfRaw[new])
+            df = pd.concat([dfKept, dfNew])
+        else:
+            df = dfKept
+        # Rows are put back in the order of dfRaw
+        order = np.argsort(dfRaw.index.get_indexer(df.index), kind="stable")
+        df = df.iloc[order]
+        # Categories of previous and new rows are different, so they are joined again
+        if self.compact_catalogue is True:
+            df = self.compact_ID(df)
+        previous_positions = np.concatenate([kept_positions, np.full(len(df) - len(dfKept), -1, dtype=np.int64)])[order]
+        
+        deleted = len(snapshot) - snapshot.index.isin(hashes).sum()
+        print("Incremental cleaning, new or changed rows: ", int(new.sum()), " Unchanged rows: ", int((~new).sum()), " Old rows removed: ", int(deleted))
+        return df, self.ID_snapshot(dfRaw, df), previous_positions
+    
+    
+    # Returns compact version of cleaned dfID with the same values:
+    # ID as int64 if all ID's are whole numbers written the same way as numbers, RAM as number of GB, other columns of SPECS_COLUMNS as categories
+    # Columns not used for matching are dropped, except CATALOGUE_COLUMN of ID files merged by self.load_catalogues
+    # HDD stays text (as category) because 'BRAK DYSKU' has to be told apart from disks without size
+    def compact_ID(self, df):
+        compact = pd.DataFrame(index=df.index)
+        # ID's like '00123' or '1e3' would be written differently as numbers, so they stay text
+        ids = pd.to_numeric(df['ID'], errors='coerce')
+        if ids.notna().all() and (ids % 1 == 0).all() and ids.astype('int64').astype(str).equals(df['ID'].astype(str)):
+            compact['ID'] = ids.astype('int64')
+        else:
+            compact['ID'] = df['ID'].astype(str)
+        for column in SPECS_COLUMNS:
+            if column == 'RAM':
+                mapping = {value: self.rules.first_number(value) for value in df[column].unique()}
+                compact[column] = df[column].map(mapping).astype('int32')
+            else:
+                compact[column] = df[column].astype('category')
+        if CATALOGUE_COLUMN in df.columns:
+            compact[CATALOGUE_COLUMN] = df[CATALOGUE_COLUMN].astype('category')
+        return compact
+    
+    
     # Function to extract values from the "Specs" column
     def extract_specs(self, specs):
         parts = specs.split(' / ')
@@ -367,22 +1489,22 @@ class IDGenerator:
                 part = part.strip()
                 
                 # Check for touchscreen (keyword "dotyk")
-                if 'dotyk' in part.lower():
+                if self.rules.is_touchscreen(part):
                     touchscreen = 'Yes'
                 
                 # Check for Windows version (keywords like "W11P", "W11H", "Win11Pro", etc.)
-                if any(win_keyword in part for win_keyword in ['W11P', 'W11H', 'Win11Pro', 'Win11Home']):
+                if self.rules.is_windows(part):
                     windows_version = part
                 
                 # Check for laptop class (keyword "Klasa")
-                if 'Klasa' in part:
-                    laptop_class = part.replace("Klasa ", "") # Remove 'Klasa '
+                if self.rules.is_class(part):
+                    laptop_class = self.rules.class_value(part) # Remove 'Klasa '
             
             # Check for resolution (look for a part containing ")
             for part in parts:
-                if '"' in part or "HD" in part or "XGA" in part:
+                if self.rules.is_resolution(part):
                     resolution = part.strip()
-                if any(gpu_keyword in part for gpu_keyword in ['GeForce', 'T2000', 'MX', 'RX', 'GTX', 'RTX', 'P3200', 'T1200']):
+                if self.rules.is_gpu(part):
                     graphics = part.strip()
             
             return pd.Series([manufacturer, model, processor, ram, disk, graphics, resolution, touchscreen, windows_version, laptop_class])
@@ -399,28 +1521,15 @@ class IDGenerator:
         for index, row in df.iterrows():
             #print(index)
             # Fix 'Model' being in 'Manufacturer' column because of wrong usage of ' / ' split character in source file
-            if 'thinkpad' in row['Manufacturer'].lower():
-                df.at[index, 'Model'] = "ThinkPad " + row['Model']
-                df.at[index, 'Manufacturer'] = "Lenovo"
-                
-            elif 'thinkbook' in row['Manufacturer'].lower():
-                df.at[index, 'Model'] = "ThinkBook " + row['Model']
-                df.at[index, 'Manufacturer'] = "Lenovo"
-                
-            elif 'yoga' in row['Manufacturer'].lower():
-                df.at[index, 'Model'] = "Yoga " + row['Model']
-                df.at[index, 'Manufacturer'] = "Lenovo"
-                
-            elif 'probook' in row['Manufacturer'].lower():
-                df.at[index, 'Model'] = "ProBook " + row['Model']
-                df.at[index, 'Manufacturer'] = "HP"
-                
-            elif 'elitebook' in row['Manufacturer'].lower():
-                df.at[index, 'Model'] = "ProBook " + row['Model']
-                df.at[index, 'Manufacturer'] = "HP"
+            # Only the first fix that applies is used, ex. 'ThinkPad' -> Model 'ThinkPad ...', Manufacturer 'Lenovo'
+            for keyword, prefix, manufacturer in self.rules.manufacturer_fixes:
+                if keyword in row['Manufacturer'].lower():
+                    df.at[index, 'Model'] = prefix + row['Model']
+                    df.at[index, 'Manufacturer'] = manufacturer
+                    break
                 
             # Fix column shift caused by wrong formatting of processor value in source file
-            if 'generacji' in row['Model'].lower():
+            if self.rules.shift_keyword in row['Model'].lower():
                 parts = row['Model'].split(' ')
                 model = ' '.join(parts[:-4])  # Every word excluding last 4
                 processor = ' '.join(parts[-4:])  # Last 4 words
@@ -434,5 +1543,90 @@ class IDGenerator:
                 #print(row['ID'])
                 df.at[index, 'Processor'] = "-"
             
-        return df 
-    
\ No newline at end of file
+        return df
+    
+    
+    # Same as self.extract_specs, but extracts values for entire "Specs" column at once
+    # Returns df with SPECS_COLUMNS, rows that extract_specs can't handle are left blank
+    def extract_specs_columns(self, specs):
+        # Every part of every name in one array, rows holds position of the name each part comes from
+        parts = specs.fillna("").str.split(' / ')
+        lengths = parts.str.len().to_numpy()
+        rows = np.repeat(np.arange(len(parts)), lengths)
+        first = np.concatenate([[0], np.cumsum(lengths)[:-1]]).astype(np.intp)
+        
+        # Names are built from a small set of distinct parts, so every operation is done only once per distinct part
+        codes, uniques = pd.factorize(parts.explode().to_numpy())
+        stripped = np.array([unique.strip() for unique in uniques], dtype=object)
+        
+        # Value of n-th part of every name, names with less parts get ""
+        def nth_part(n, values):
+            found = np.full(len(parts), "", dtype=object)
+            has_part = lengths > n
+            found[has_part] = values[codes[first[has_part] + n]]
+            return found
+        
+        # Value of the last part that contains keyword, default value if no part contains it
+        def last_part(condition, default):
+            found = np.full(len(parts), default, dtype=object)
+            positions = np.flatnonzero(np.array([condition(unique) for unique in stripped], dtype=bool)[codes])
+            found[rows[positions]] = stripped[codes[positions]]
+            return found
+        
+        # Assumes format "Laptop Manufacturer Model"
+        words = [unique.split(' ') for unique in uniques]
+        manufacturer = nth_part(0, np.array([word[1] if len(word) > 1 else None for word in words], dtype=object))
+        model = nth_part(0, np.array([' '.join(word[2:]) for word in words], dtype=object))
+        
+        df = pd.DataFrame(index=specs.index)
+        df['Manufacturer'] = manufacturer
+        df['Model'] = model
+        df['Processor'] = nth_part(1, stripped)
+        df['RAM'] = nth_part(2, uniques.astype(object))
+        df['HDD'] = nth_part(3, uniques.astype(object))
+        
+        # Following columns are optional and may not always be present
+        df['Graphics'] = last_part(self.rules.is_gpu, '-')
+        df['Resolution'] = last_part(self.rules.is_resolution, '-')
+        df['Touchscreen'] = np.where(pd.isna(last_part(self.rules.is_touchscreen, None)), 'No', 'Yes')
+        df['Windows'] = last_part(self.rules.is_windows, '-')
+        df['Class'] = last_part(self.rules.is_class, '-')
+        df['Class'] = df['Class'].map(self.rules.class_value)
+        
+        # Rows with less than 4 parts or without model are blanked
+        invalid = (lengths < 4) | pd.isna(manufacturer)
+        df.loc[invalid, SPECS_COLUMNS] = ""
+        return df[SPECS_COLUMNS]
+    
+    
+    # Same as self.format_specs, but fixes entire columns at once with masks
+    def format_specs_columns(self, df):
+        df = df.copy()
+        # Fixes are checked on values from before any fix, like self.format_specs does with rows of df.iterrows
+        # Columns are copied, otherwise they could be views of df that change with it
+        manufacturer = df['Manufacturer'].str.lower()
+        model = df['Model'].copy()
+        processor = df['Processor'].copy()
+        ram = df['RAM'].copy()
+        
+        # Fix 'Model' being in 'Manufacturer' column because of wrong usage of ' / ' split character in source file
+        # Only the first fix that applies is used
+        fixed = pd.Series(False, index=df.index)
+        for keyword, prefix, fixed_manufacturer in self.rules.manufacturer_fixes:
+            mask = ~fixed & manufacturer.str.contains(keyword, regex=False)
+            df.loc[mask, 'Model'] = prefix + model[mask]
+            df.loc[mask, 'Manufacturer'] = fixed_manufacturer
+            fixed |= mask
+        
+        # Fix column shift caused by wrong formatting of processor value in source file
+        shifted = model.str.lower().str.contains(self.rules.shift_keyword, regex=False)
+        words = model[shifted].str.split(' ')
+        df.loc[shifted, 'HDD'] = ram[shifted]
+        df.loc[shifted, 'RAM'] = processor[shifted]
+        df.loc[shifted, 'Model'] = words.str[:-4].str.join(' ')  # Every word excluding last 4
+        df.loc[shifted, 'Processor'] = words.str[-4:].str.join(' ')  # Last 4 words
+        
+        # Every other shift error blanked
+        df.loc[~shifted & processor.str.lower().str.contains('gb', regex=False), 'Processor'] = "-"
+        
+        return df
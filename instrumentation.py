@@ -0,0 +1,99 @@
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+
+
+# Progress of a stage sent to GUI through result queue of IDGenerator.read_files and IDGenerator.process_files
+# done and total are None for stages without known size, eta is None until it can be estimated
+ProgressEvent = namedtuple('ProgressEvent', ['stage', 'done', 'total', 'elapsed', 'eta'])
+
+# Stages timed by IDGenerator, in order they usually run
+STAGES = ['download', 'parse', 'clean', 'index', 'match', 'write']
+
+
+# Collects time spent in every stage and counters (rows, candidates, cache hits) of one run
+# If listener queue is set, stages and progress are also sent to it as ProgressEvent
+class Instrumentation:
+
+    def __init__(self, interval=0.2):
+        # Minimal number of seconds between two progress events of the same stage
+        self.interval = interval
+        self.listener = None
+        self.reset()
+
+
+    def reset(self):
+        # {stage: seconds}, repeated stages are summed
+        self.stages = {}
+        # {counter: value}
+        self.counters = {}
+        # {stage: (time of first progress, time of last sent event)}
+        self.progress_times = {}
+
+
+    # Queue events are sent to, None stops sending them
+    def listen(self, listener):
+        self.listener = listener
+
+
+    # Queues aren't passed to worker processes
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['listener'] = None
+        return state
+
+
+    # Measures time of code inside 'with' block, ex. with stats.stage("clean"): ...
+    @contextmanager
+    def stage(self, name):
+        self.send(ProgressEvent(name, None, None, 0.0, None))
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+
+    def count(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+
+    # Adds counters collected somewhere else, ex. in worker process
+    def merge(self, counters):
+        for name, value in counters.items():
+            self.count(name, value)
+
+
+    # Sends progress of stage at most every self.interval seconds, the last step is always sent
+    def progress(self, stage, done, total):
+        if self.listener is None:
+            return
+        now = time.perf_counter()
+        if stage not in self.progress_times:
+            self.progress_times[stage] = (now, 0.0)
+        start, last = self.progress_times[stage]
+        if now - last < self.interval and done < total:
+            return
+        self.progress_times[stage] = (start, now)
+
+        elapsed = now - start
+        eta = elapsed / done * (total - done) if done > 0 else None
+        self.send(ProgressEvent(stage, done, total, elapsed, eta))
+
+
+    # Starts measuring progress of stage from zero, ex. when next report is matched
+    def restart_progress(self, stage):
+        self.progress_times.pop(stage, None)
+
+
+    def send(self, event):
+        if self.listener is not None:
+            self.listener.put(event)
+
+
+    # One line with times of stages and counters, ex. "parse 0.52 s, match 3.10 s; rows 1000, candidates 5320"
+    def summary(self):
+        names = [name for name in STAGES if name in self.stages] + [name for name in self.stages if name not in STAGES]
+        stages = ", ".join(f"{name} {self.stages[name]:.2f} s" for name in names)
+        counters = ", ".join(f"{name} {value}" for name, value in self.counters.items())
+        return "; ".join(part for part in [stages, counters] if part)
@@ -0,0 +1,110 @@
+import os
+import pickle
+from collections import OrderedDict
+
+
+# Columns of input file that decide the result of IDGenerator.match_one, values are compared lowercased
+KEY_COLUMNS = ['Producent', 'Model', 'Procesor', 'Docelowa', 'Grafika', 'Wyświetlacz', 'Windows', 'Klasa']
+
+
+# Results of matching for laptop configurations that were already matched against the same catalogue
+# Reports have many laptops with identical configuration, only the first of them is scored
+# Entries are evicted in least recently used order when there are more than max_size of them
+class MatchCache:
+
+    def __init__(self, max_size=50000):
+        # 0 turns cache off
+        self.max_size = max_size
+        # {key of configuration: result of IDGenerator.match_one}
+        self.entries = OrderedDict()
+        # Catalogue results were found in, entries are valid only for it
+        self.dfID = None
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+
+
+    # Clears cache if it was filled for different catalogue
+    # version identifies cleaned ID file (see IDGenerator.match_cache_version), entries are kept if it's the same
+    def use(self, dfID, version):
+        if self.dfID is dfID:
+            return
+        if version is None or version != self.version:
+            self.entries.clear()
+        self.dfID = dfID
+        self.version = version
+
+
+    # Catalogue itself is not sent to worker processes, they get it separately
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['dfID'] = None
+        return state
+
+
+    # Key of configuration of given laptop, None if it can't be cached
+    def key(self, input_row, hdd_switch):
+        if self.max_size <= 0:
+            return None
+        try:
+            return (hdd_switch,) + tuple(value.lower() if isinstance(value, str) else value for value in (input_row[column] for column in KEY_COLUMNS))
+        except KeyError:
+            return None
+
+
+    # Returns (True, result) if configuration was matched before, (False, None) otherwise
+    def get(self, key):
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return True, self.entries[key]
+        self.misses += 1
+        return False, None
+
+
+    def put(self, key, matched):
+        self.entries[key] = matched
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+
+    # Adds entries found somewhere else, ex. in worker process
+    def update(self, entries):
+        for key, matched in entries.items():
+            self.put(key, matched)
+
+
+    # Entries of given keys that are in cache
+    def select(self, keys):
+        return {key: self.entries[key] for key in keys if key is not None and key in self.entries}
+
+
+    # Part of all lookups that were found in cache
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+    # Reads entries saved by self.save, they are used only if they were found for the same version of catalogue
+    def load(self, filename, version):
+        try:
+            with open(filename, "rb") as file:
+                saved_version, entries = pickle.load(file)
+        except Exception:
+            return False
+        if version is None or saved_version != version:
+            return False
+        self.entries = OrderedDict(entries)
+        self.version = version
+        return True
+
+
+    # Saves entries under temporary name and renames it, so cache file is never incomplete
+    def save(self, filename):
+        if self.version is None:
+            return
+        os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
+        with open(filename + ".part", "wb") as file:
+            pickle.dump((self.version, list(self.entries.items())), file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(filename + ".part", filename)
@@ -0,0 +1,198 @@
+import os
+import re
+import json
+import hashlib
+import numbers
+from collections import namedtuple
+
+import pandas as pd
+
+
+# Rules used to extract values from ID file and to match laptops from input file with them
+# Every key can be overridden in match_rules.json placed next to the program, for example:
+#   {"gpu_keywords": ["GeForce", "MX", "RX", "GTX", "RTX", "Quadro"],
+#    "windows_aliases": {"w11p": {"input": ["win11pro", "win11p", "w11p"], "catalogue": ["w11p"]}}}
+# Keyword lists are case sensitive, aliases are compared with lowercased values
+# Alias maps give canonical token with its spellings used in input file and in ID file,
+# values match if they share at least one canonical token
+DEFAULT_RULES = {
+    # Parts of 'Pełna nazwa' recognized as graphics, Windows version and resolution
+    "gpu_keywords": ['GeForce', 'T2000', 'MX', 'RX', 'GTX', 'RTX', 'P3200', 'T1200'],
+    "windows_keywords": ['W11P', 'W11H', 'Win11Pro', 'Win11Home'],
+    "resolution_keywords": ['"', 'HD', 'XGA'],
+    # Part of 'Pełna nazwa' with laptop class, keyword followed by space is removed from it
+    "class_keyword": "Klasa",
+    # Case insensitive keyword of touchscreen in 'Pełna nazwa' and in 'Wyświetlacz'
+    "touchscreen_keyword": "dotyk",
+    # Case insensitive keyword of rows of ID file that are not laptops
+    "docking_keyword": "dokująca",
+    # Keyword of model with processor moved into it, see IDGenerator.format_specs
+    "shift_keyword": "generacji",
+    # HDD value of ID's without disk
+    "hdd_missing": "BRAK DYSKU",
+    # [keyword in Manufacturer, prefix added to Model, correct Manufacturer], only the first matching fix is used
+    "manufacturer_fixes": [
+        ["thinkpad", "ThinkPad ", "Lenovo"],
+        ["thinkbook", "ThinkBook ", "Lenovo"],
+        ["yoga", "Yoga ", "Lenovo"],
+        ["probook", "ProBook ", "HP"],
+        ["elitebook", "ProBook ", "HP"],
+    ],
+    "windows_aliases": {
+        "w11p": {"input": ['win11pro', 'win11p', 'w11p'], "catalogue": ['w11p']},
+        "w11h": {"input": ['win11home', 'win11h', 'w11h'], "catalogue": ['w11h']},
+    },
+    "resolution_aliases": {
+        "fhd": {"input": ['fhd'], "catalogue": ['fullhd', 'full hd']},
+    },
+    # "tokens" matches models by whole words, see ModelIndex, "substring" is the old check where
+    # model of input laptop only has to be contained in model of ID file (ex. T480 matches T480s)
+    "model_matching": "tokens",
+    # Case insensitive endings of model words and whole words that make a different model, ex. T480s or 840 G5 Silver
+    "model_variant_suffixes": ['s'],
+    "model_variant_tokens": ['silver'],
+}
+
+RULES_FILENAME = "match_rules.json"
+
+NUMBER = re.compile(r'\d+')
+
+# Values of one laptop from input file used after Manufacturer, Model and Processor are matched
+InputSpecs = namedtuple('InputSpecs', ['ram', 'hdd', 'graphics', 'display', 'resolution_tokens', 'touchscreen', 'windows_tokens', 'lap_class'])
+
+
+class MatchRules:
+
+    def __init__(self, rules=None):
+        self.rules = dict(DEFAULT_RULES)
+        if rules:
+            self.rules.update(rules)
+
+        self.gpu = self.compile_keywords(self.rules['gpu_keywords'])
+        self.windows = self.compile_keywords(self.rules['windows_keywords'])
+        self.resolution = self.compile_keywords(self.rules['resolution_keywords'])
+        self.class_keyword = self.rules['class_keyword']
+        self.touchscreen_keyword = self.rules['touchscreen_keyword'].lower()
+        self.docking_keyword = self.rules['docking_keyword']
+        self.shift_keyword = self.rules['shift_keyword'].lower()
+        self.hdd_missing = self.rules['hdd_missing']
+        self.manufacturer_fixes = [(keyword.lower(), prefix, manufacturer) for keyword, prefix, manufacturer in self.rules['manufacturer_fixes']]
+        self.windows_aliases = self.compile_aliases(self.rules['windows_aliases'])
+        self.resolution_aliases = self.compile_aliases(self.rules['resolution_aliases'])
+        self.model_matching = self.rules['model_matching']
+        if self.model_matching not in ("tokens", "substring"):
+            raise ValueError(f"Unknown model matching: {self.model_matching}")
+        self.model_variant_suffixes = frozenset(suffix.lower() for suffix in self.rules['model_variant_suffixes'])
+        self.model_variant_tokens = frozenset(token.lower() for token in self.rules['model_variant_tokens'])
+
+
+    # Reads rules from json file, default rules are used if there is no file
+    @classmethod
+    def load(cls, filename=RULES_FILENAME):
+        if not os.path.exists(filename):
+            return cls()
+        with open(filename, "r", encoding="utf-8") as file:
+            return cls(json.load(file))
+
+
+    # Short hash of all rules, values cleaned with different rules can't be mixed
+    def fingerprint(self):
+        return hashlib.sha1(json.dumps(self.rules, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+    @staticmethod
+    def compile_keywords(keywords):
+        if not keywords:
+            return re.compile(r'(?!)')  # Never matches
+        return re.compile('|'.join(map(re.escape, keywords)))
+
+
+    @staticmethod
+    def compile_aliases(aliases):
+        return [(token, tuple(alias.lower() for alias in spellings['input']), tuple(alias.lower() for alias in spellings['catalogue']))
+                for token, spellings in aliases.items()]
+
+
+    # Canonical tokens of lowercased value, side is 1 for input file and 2 for ID file
+    @staticmethod
+    def tokens(aliases, value, side):
+        return frozenset(alias[0] for alias in aliases if any(spelling in value for spelling in alias[side]))
+
+
+    # Checks used by IDGenerator.extract_specs for every part of 'Pełna nazwa'
+    def is_gpu(self, part):
+        return self.gpu.search(part) is not None
+
+    def is_windows(self, part):
+        return self.windows.search(part) is not None
+
+    def is_resolution(self, part):
+        return self.resolution.search(part) is not None
+
+    def is_class(self, part):
+        return self.class_keyword in part
+
+    def class_value(self, part):
+        return part.replace(self.class_keyword + " ", "")
+
+    def is_touchscreen(self, text):
+        return self.touchscreen_keyword in text.lower()
+
+
+    # First number in value, -1 if there is none, numbers (ex. RAM of compact dfID) are returned as they are
+    @staticmethod
+    def first_number(value):
+        if isinstance(value, numbers.Integral):
+            return int(value)
+        found = NUMBER.search(value)
+        return int(found.group(0)) if found else -1
+
+
+    # Normalizes cleaned ID file once, so matching only compares prepared values
+    # Every function is called once per distinct value of a column
+    def normalize_catalogue(self, dfID):
+        def normalize(column, function):
+            values = dfID[column]
+            mapping = {value: function(value) for value in values.unique()}
+            return values.map(mapping).to_numpy(dtype=object)
+
+        df = pd.DataFrame(index=dfID.index)
+        df['ID'] = dfID['ID'].to_numpy()
+        df['manufacturer'] = normalize('Manufacturer', str.lower)
+        df['model'] = normalize('Model', str.lower)
+        df['processor'] = normalize('Processor', str.lower)
+        df['ram'] = normalize('RAM', self.first_number).astype(int)
+        df['hdd'] = normalize('HDD', self.first_number).astype(int)
+        df['hdd_missing'] = normalize('HDD', lambda value: self.hdd_missing in value).astype(bool)
+        df['graphics'] = normalize('Graphics', str.lower)
+        df['resolution'] = normalize('Resolution', str.lower)
+        df['resolution_tokens'] = normalize('Resolution', lambda value: self.tokens(self.resolution_aliases, value.lower(), 2))
+        df['touchscreen'] = dfID['Touchscreen'].to_numpy(dtype=object)
+        df['windows_tokens'] = normalize('Windows', lambda value: self.tokens(self.windows_aliases, value.lower(), 2))
+        df['lap_class'] = normalize('Class', str.lower)
+        return df
+
+
+    # Lowercased Manufacturer, Model and Processor of laptop from input file
+    def normalize_input_keys(self, input_row):
+        return input_row['Producent'].lower(), input_row['Model'].lower(), input_row['Procesor'].lower()
+
+
+    # Other values of laptop from input file, raises error if they are missing or have wrong format
+    def normalize_input_specs(self, input_row):
+        # Extract RAM and HDD values from input data
+        matches = NUMBER.findall(input_row['Docelowa'])
+        ram = int(matches[0])
+        hdd = int(matches[1])
+
+        display = input_row['Wyświetlacz'].lower()
+        return InputSpecs(
+            ram=ram,
+            hdd=hdd,
+            graphics=input_row['Grafika'].lower(),
+            display=display,
+            resolution_tokens=self.tokens(self.resolution_aliases, display, 1),
+            touchscreen='Yes' if self.is_touchscreen(display) else 'No',
+            windows_tokens=self.tokens(self.windows_aliases, input_row['Windows'].lower(), 1),
+            lap_class=input_row['Klasa'].lower(),
+        )
@@ -0,0 +1,88 @@
+import re
+from bisect import bisect_left
+
+
+TOKEN = re.compile(r'[a-z0-9]+')
+
+
+# Index of distinct lowercased models of ID file by their tokens, ex. 'thinkpad t14s gen 2' -> ['thinkpad', 't14s', 'gen', '2']
+# Model of input laptop matches model of ID file if its tokens are found one after another in tokens of that model:
+#  - every token but the last has to be equal,
+#  - the last token can be the beginning of longer token (ex. 'x1' of 'x1c'), unless the rest is variant suffix
+#    from MatchRules (ex. 's' of 't480s') or a digit following a digit (ex. 't48' of 't480)
+#  - model of ID file can't have a variant token (ex. 'silver') that input model doesn't have
+# Tokens are kept sorted, so models with tokens starting with given text are found by binary search like in a trie
+class ModelIndex:
+
+    def __init__(self, models, rules):
+        self.models = list(models)
+        self.variant_suffixes = rules.model_variant_suffixes
+        self.variant_tokens = rules.model_variant_tokens
+        self.tokens = [self.tokenize(model) for model in self.models]
+
+        # {token: positions of models with that token}
+        self.postings = {}
+        for position, tokens in enumerate(self.tokens):
+            for token in set(tokens):
+                self.postings.setdefault(token, []).append(position)
+        self.sorted_tokens = sorted(self.postings)
+
+
+    @staticmethod
+    def tokenize(model):
+        return TOKEN.findall(model)
+
+
+    # Tokens of the index starting with given text
+    def starting_with(self, text):
+        start = bisect_left(self.sorted_tokens, text)
+        end = start
+        while end < len(self.sorted_tokens) and self.sorted_tokens[end].startswith(text):
+            end += 1
+        return self.sorted_tokens[start:end]
+
+
+    # Checks if catalogue token can stand for the last token of input model
+    def extends(self, token, catalogue_token):
+        if not catalogue_token.startswith(token):
+            return False
+        rest = catalogue_token[len(token):]
+        if rest == "":
+            return True
+        if rest in self.variant_suffixes:
+            return False
+        return not (token[-1].isdigit() and rest[0].isdigit())
+
+
+    # Checks if tokens of input model are found in tokens of model of ID file
+    def matches(self, tokens, catalogue_tokens):
+        variants = [token for token in catalogue_tokens if token in self.variant_tokens and token not in tokens]
+        if variants:
+            return False
+        last = len(tokens) - 1
+        for start in range(len(catalogue_tokens) - last):
+            if catalogue_tokens[start:start + last] == tokens[:last] and self.extends(tokens[last], catalogue_tokens[start + last]):
+                return True
+        return False
+
+
+    # Returns positions (in order of given models) of models matching given input model
+    def lookup(self, model):
+        tokens = self.tokenize(model)
+        if not tokens:
+            # The same as substring check, empty model is found in every model
+            return list(range(len(self.models))) if model == "" else [position for position, value in enumerate(self.models) if model in value]
+
+        # Only models having all tokens but the last one and a token starting with the last one can match
+        found = None
+        for token in tokens[:-1]:
+            positions = set(self.postings.get(token, ()))
+            found = positions if found is None else found & positions
+            if not found:
+                return []
+        extended = set()
+        for token in self.starting_with(tokens[-1]):
+            extended.update(self.postings[token])
+        found = extended if found is None else found & extended
+
+        return [position for position in sorted(found) if self.matches(tokens, self.tokens[position])]
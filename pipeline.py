@@ -0,0 +1,95 @@
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+
+# Result of one report processed by run_pipeline, error is None if report was matched and saved
+ReportResult = namedtuple('ReportResult', ['report', 'output_name', 'rows', 'matches_found', 'seconds', 'error'])
+
+
+# Loads and cleans ID file, runs in background thread of run_pipeline
+def load_catalogue(generator, id_source):
+    generator.load_ID(id_source)
+    generator.prepare_ID()
+    return generator.dfID
+
+
+# Matches many reports with one ID file, stages of different reports overlap:
+#  - ID file is downloaded and cleaned in background thread while the first reports are parsed,
+#  - up to prefetch next reports are parsed in background threads while the current one is matched,
+#  - output of each report is written in background thread while the next one is matched.
+# Download, reading and writing of files mostly wait for disk and network, so they run next to matching in threads
+# Reports are matched one by one in calling thread, with generator.workers processes if it's set
+# Yields ReportResult of every report in the given order, raises error if ID file couldn't be loaded
+# prefetch has to be at least 1, ValueError is raised before anything is loaded otherwise
+def run_pipeline(generator, id_source, reports, output_folder, prefetch=2):
+    if prefetch < 1:
+        raise ValueError(f"prefetch has to be at least 1, not {prefetch}")
+    with ThreadPoolExecutor(max_workers=1) as loader, ThreadPoolExecutor(max_workers=prefetch) as readers, ThreadPoolExecutor(max_workers=1) as writer:
+        catalogue = loader.submit(load_catalogue, generator, id_source) if id_source is not None else None
+
+        # Big reports are not parsed in advance, they are read in chunks by IDGenerator.process_stream
+        def read(report):
+            return None if generator.should_stream(report) else readers.submit(generator.read_input, report)
+
+        waiting = deque(reports)
+        parsing = deque()
+        while waiting and len(parsing) < prefetch:
+            report = waiting.popleft()
+            parsing.append((report, read(report)))
+
+        dfID = catalogue.result() if catalogue is not None else generator.dfID
+        writing = None
+        for done in range(len(reports)):
+            report, parsed = parsing.popleft()
+            if waiting:
+                next_report = waiting.popleft()
+                parsing.append((next_report, read(next_report)))
+
+            start = time.perf_counter()
+            output_name = generator.output_filename(report, output_folder)
+            generator.stats.restart_progress("match")
+            try:
+                if parsed is None:
+                    matches_found = generator.process_stream(report, output_name, dfID)
+                    result = ReportResult(report, output_name, None, matches_found, time.perf_counter() - start, None)
+                    written = None
+                else:
+                    checkpoint = generator.open_checkpoint(report, output_name, dfID)
+                    dfOutput, matches_found = generator.match_ID(parsed.result(), dfID, checkpoint=checkpoint)
+                    if isinstance(dfOutput, Exception):
+                        raise dfOutput
+                    written = writer.submit(write_report, generator, dfOutput, output_name, checkpoint)
+                    result = ReportResult(report, output_name, len(dfOutput), matches_found, time.perf_counter() - start, None)
+            except Exception as e:
+                result = ReportResult(report, output_name, None, None, time.perf_counter() - start, e)
+                written = None
+
+            # Result of previous report is complete when its output is written
+            if writing is not None:
+                yield finish(*writing)
+            writing = (result, written)
+            generator.stats.progress("reports", done + 1, len(reports))
+
+        if writing is not None:
+            yield finish(*writing)
+
+
+# Writes output of report, runs in background thread of run_pipeline
+# Checkpoint of the report is not needed after that, see IDGenerator.open_checkpoint
+def write_report(generator, dfOutput, output_name, checkpoint):
+    generator.write_output(dfOutput, output_name)
+    if checkpoint is not None:
+        checkpoint.remove()
+
+
+# Waits for output of report to be written, time of writing is added to time of report
+def finish(result, written):
+    if written is None:
+        return result
+    start = time.perf_counter()
+    try:
+        written.result()
+    except Exception as e:
+        return result._replace(seconds=result.seconds + time.perf_counter() - start, error=e)
+    return result._replace(seconds=result.seconds + time.perf_counter() - start)
@@ -0,0 +1,314 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import threading
+import multiprocessing
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pandas as pd
+
+from id_generator import IDGenerator, OUTPUT_FORMATS
+
+
+# Local matching service, keeps cleaned and indexed ID file in memory so every request only matches laptops
+# ID file is refreshed in background, a local .xlsx file can be used instead of Drive link, ex.
+#   python service.py --id "https://drive.google.com/file/d/<file id>/view" --port 8765
+#   python service.py --id raw_date.xlsx --refresh 60
+#
+# API (all responses except /report are json):
+#   GET  /status                        catalogue version, number of ID's, time of the last refresh
+#   POST /refresh                       refreshes ID file now
+#   POST /match?hdd=0                   body {"laptops": [{"Producent": ..., "Model": ..., ...}, ...]},
+#                                       returns {"results": ['Znalezione ID' of every laptop, null if it has no model]}
+#   POST /report?hdd=0&format=xlsx      body is .xlsx report, returns output file in given format,
+#                                       number of found ID's is in X-Matches-Found header
+# ServiceClient below is a client of this API
+
+
+DEFAULT_PORT = 8765
+
+
+class MatchingService:
+
+    def __init__(self, generator, source, refresh_interval=900):
+        self.generator = generator
+        # Drive link or local file with ID's, see IDGenerator.load_ID
+        self.source = source
+        # Seconds between background refreshes, 0 turns them off
+        self.refresh_interval = refresh_interval
+        # IDGenerator is not thread safe, requests use it one at a time
+        self.lock = threading.Lock()
+        # New revisions of ID file are loaded and cleaned by separate IDGenerator, so requests are matched meanwhile
+        # with the previous one. Only one refresh runs at a time
+        self.loader = None
+        self.refresh_lock = threading.Lock()
+        self.refreshed_at = None
+        self.refresh_error = None
+        self.stop_event = threading.Event()
+
+
+    # Loads new revision of ID file if there is one, cleans it and builds index used for matching
+    # Requests are blocked only while prepared ID file is handed over to self.generator
+    def refresh(self):
+        with self.refresh_lock:
+            if self.loader is None:
+                self.loader = self.generator.catalogue_generator()
+                self.loader.match_engine = self.generator.match_engine
+                self.loader.group_catalogue = self.generator.group_catalogue
+            try:
+                self.loader.load_ID(self.source)
+                self.loader.prepare_ID()
+                if self.loader.match_engine == "vectorized":
+                    self.loader.get_matcher(self.loader.dfID)
+                else:
+                    self.loader.get_index(self.loader.dfID)
+            except Exception as e:
+                with self.lock:
+                    self.refresh_error = str(e)
+                raise
+            with self.lock:
+                self.generator.use_catalogue_of(self.loader)
+                self.refresh_error = None
+                self.refreshed_at = datetime.now().isoformat(timespec="seconds")
+
+
+    def refresh_loop(self):
+        while not self.stop_event.wait(self.refresh_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Cannot refresh ID file: {e}", file=sys.stderr)
+
+
+    def start_refreshing(self):
+        if self.refresh_interval > 0:
+            threading.Thread(target=self.refresh_loop, daemon=True).start()
+
+
+    def status(self):
+        with self.lock:
+            return {
+                "source": self.source,
+                "file_id": self.generator.fID_file_id,
+                "version": self.generator.fID_version,
+                "ids": None if self.generator.dfID is None else len(self.generator.dfID),
+                "refreshed_at": self.refreshed_at,
+                "refresh_error": self.refresh_error,
+                "match_cache_hit_rate": round(self.generator.match_cache.hit_rate(), 3),
+            }
+
+
+    # Matches dfInput with loaded ID's, raises error if any laptop couldn't be matched
+    def match_frame(self, dfInput, hdd_switch):
+        with self.lock:
+            self.generator.toggle_hdd_switch(hdd_switch)
+            dfOutput, matches_found = self.generator.match_ID(dfInput, self.generator.dfID)
+        if isinstance(dfOutput, Exception):
+            raise dfOutput
+        return dfOutput, matches_found
+
+
+    # Matches laptops given as dicts with columns of input file, returns 'Znalezione ID' of every laptop
+    # Laptops without model are not matched, None is returned for them
+    def match_laptops(self, laptops, hdd_switch):
+        dfInput = pd.DataFrame(laptops)
+        if 'Lp.' not in dfInput.columns:
+            dfInput['Lp.'] = range(1, len(dfInput) + 1)
+        if 'S/N' not in dfInput.columns:
+            dfInput['S/N'] = ""
+        if 'Model' not in dfInput.columns:
+            dfInput['Model'] = None
+        dfOutput, _ = self.match_frame(dfInput, hdd_switch)
+        results = dfOutput['Znalezione ID'].reindex(dfInput.index)
+        return [None if pd.isna(result) else result for result in results]
+
+
+    # Matches uploaded report, returns (content of output file, number of found ID's)
+    def match_report(self, content, hdd_switch, output_format):
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Unknown output format: {output_format}")
+        work_dir = tempfile.mkdtemp(prefix="id_generator_service_")
+        try:
+            input_name = os.path.join(work_dir, "raport.xlsx")
+            output_name = os.path.join(work_dir, "raport_znalezione." + output_format)
+            with open(input_name, "wb") as file:
+                file.write(content)
+            dfOutput, matches_found = self.match_frame(self.generator.read_input(input_name), hdd_switch)
+            self.generator.write_output(dfOutput, output_name)
+            with open(output_name, "rb") as file:
+                return file.read(), matches_found
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+
+    # MatchingService is set by serve
+    service = None
+
+    CONTENT_TYPES = {
+        "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        "csv": "text/csv",
+        "parquet": "application/octet-stream",
+    }
+
+
+    def do_GET(self):
+        path, query = self.parse_path()
+        if path == "/status":
+            self.send_json(200, self.service.status())
+        else:
+            self.send_json(404, {"error": f"Unknown path: {path}"})
+
+
+    def do_POST(self):
+        path, query = self.parse_path()
+        hdd_switch = query.get("hdd", "0") in ("1", "true", "yes")
+        try:
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            if path == "/refresh":
+                self.service.refresh()
+                self.send_json(200, self.service.status())
+            elif path == "/match":
+                laptops = json.loads(body.decode("utf-8"))["laptops"]
+                self.send_json(200, {"results": self.service.match_laptops(laptops, hdd_switch)})
+            elif path == "/report":
+                output_format = query.get("format", "xlsx")
+                content, matches_found = self.service.match_report(body, hdd_switch, output_format)
+                self.send_response(200)
+                self.send_header("Content-Type", self.CONTENT_TYPES[output_format])
+                self.send_header("Content-Length", str(len(content)))
+                self.send_header("X-Matches-Found", str(matches_found))
+                self.end_headers()
+                self.wfile.write(content)
+            else:
+                self.send_json(404, {"error": f"Unknown path: {path}"})
+        except (KeyError, ValueError) as e:
+            self.send_json(400, {"error": str(e)})
+        except Exception as e:
+            self.send_json(500, {"error": str(e)})
+
+
+    def parse_path(self):
+        url = urllib.parse.urlsplit(self.path)
+        return url.path, dict(urllib.parse.parse_qsl(url.query))
+
+
+    def send_json(self, code, value):
+        content = json.dumps(value, ensure_ascii=False).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+
+    # Requests are logged to output.log by IDGenerator, not to stderr
+    def log_message(self, format, *args):
+        pass
+
+
+# Starts HTTP server of given service, it runs until serve_forever is stopped
+def serve(service, host="127.0.0.1", port=DEFAULT_PORT):
+    handler = type("BoundServiceHandler", (ServiceHandler,), {"service": service})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+# Client of MatchingService, used by cli.py --service
+class ServiceClient:
+
+    def __init__(self, url=f"http://127.0.0.1:{DEFAULT_PORT}", timeout=600):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+
+
+    def request(self, path, body=None, query=None, content_type="application/json"):
+        url = self.url + path + ("?" + urllib.parse.urlencode(query) if query else "")
+        request = urllib.request.Request(url, data=body, method="GET" if body is None else "POST")
+        request.add_header("Content-Type", content_type)
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return response.read(), response.headers
+        except urllib.error.HTTPError as e:
+            try:
+                message = json.loads(e.read().decode("utf-8"))["error"]
+            except Exception:
+                message = str(e)
+            raise RuntimeError(f"Service error: {message}") from None
+
+
+    def status(self):
+        return json.loads(self.request("/status")[0])
+
+
+    def refresh(self):
+        return json.loads(self.request("/refresh", b"")[0])
+
+
+    # Returns 'Znalezione ID' of every laptop, laptops are dicts with columns of input file
+    def match(self, laptops, hdd_switch=False):
+        body = json.dumps({"laptops": laptops}, ensure_ascii=False, default=str).encode("utf-8")
+        return json.loads(self.request("/match", body, {"hdd": int(hdd_switch)})[0])["results"]
+
+
+    # Sends report to the service and saves its output file, returns number of found ID's
+    def match_report(self, input_name, output_name, hdd_switch=False, output_format="xlsx"):
+        with open(input_name, "rb") as file:
+            content, headers = self.request("/report", file.read(), {"hdd": int(hdd_switch), "format": output_format}, "application/octet-stream")
+        with open(output_name, "wb") as file:
+            file.write(content)
+        return int(headers.get("X-Matches-Found", 0))
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Vedion ID-generator matching service, keeps ID file ready in memory")
+    parser.add_argument("--id", required=True, dest="id_source", help="link to M2 M47 file on Drive or local .xlsx file")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--refresh", type=int, default=900, help="seconds between refreshes of ID file, 0 turns them off")
+    parser.add_argument("--engine", choices=["loop", "vectorized"], default="vectorized", help="matching engine, see IDGenerator.match_engine")
+    parser.add_argument("--workers", type=int, default=1, help="number of processes used for matching of big reports")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    generator = IDGenerator()
+    generator.set_match_engine(args.engine)
+    generator.set_workers(args.workers)
+    generator.set_log_rows(False)
+
+    service = MatchingService(generator, args.id_source, args.refresh)
+    start = time.perf_counter()
+    try:
+        service.refresh()
+    except Exception as e:
+        print(f"Cannot load ID file: {e}", file=sys.stderr)
+        return 1
+    print(f"ID file: {len(generator.dfID)} ID's, {time.perf_counter() - start:.2f} s")
+
+    server = serve(service, args.host, args.port)
+    service.start_refreshing()
+    print(f"Listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.stop_event.set()
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,236 @@
+import os
+import csv
+import importlib.util
+
+import pandas as pd
+
+
+# Reading and writing of big reports in chunks of rows, so the whole report is never held in memory
+# Used by IDGenerator.process_stream and IDGenerator.write_output
+
+
+# Reads first sheet of .xlsx file in chunks of chunk_size rows, first row is the header
+# If columns are given then other columns are skipped, like usecols of IDGenerator.read_excel_sheet
+# Every chunk is a DataFrame with index continuing from the previous chunk, the same as pd.read_excel would give
+class ExcelChunkReader:
+
+    def __init__(self, filename, chunk_size, columns=None):
+        self.filename = filename
+        self.chunk_size = chunk_size
+        self.columns = columns
+        # Number of rows without header read from sheet dimensions, None if file doesn't have them
+        self.total = None
+
+
+    def __iter__(self):
+        # Read-only workbook parses sheet while rows are iterated instead of loading it at once
+        import openpyxl
+        workbook = openpyxl.load_workbook(self.filename, read_only=True, data_only=True)
+        try:
+            sheet = workbook.worksheets[0]
+            if sheet.max_row is not None:
+                self.total = max(sheet.max_row - 1, 0)
+            rows = sheet.iter_rows(values_only=True)
+
+            header = next(rows, None)
+            if header is None:
+                return
+            names = [f"Unnamed: {i}" if name is None else name for i, name in enumerate(header)]
+            positions = [i for i, name in enumerate(names) if self.columns is None or name in self.columns]
+            names = [names[i] for i in positions]
+
+            start = 0
+            chunk = []
+            for row in rows:
+                # Trailing empty cells are not returned by read-only sheets
+                row = row + (None,) * (len(header) - len(row))
+                chunk.append([row[i] for i in positions])
+                if len(chunk) == self.chunk_size:
+                    yield self.to_frame(chunk, names, start)
+                    start += len(chunk)
+                    chunk = []
+            if chunk:
+                yield self.to_frame(chunk, names, start)
+        finally:
+            workbook.close()
+
+
+    @staticmethod
+    def to_frame(chunk, names, start):
+        return pd.DataFrame(chunk, columns=names, index=pd.RangeIndex(start, start + len(chunk)))
+
+
+# Base of chunk writers, output is written to temporary file next to target file
+# and renamed only after self.close, so reports are never left half-written if matching or writing fails
+class ChunkWriter:
+
+    def __init__(self, filename):
+        self.filename = filename
+        folder, name = os.path.split(filename)
+        self.temp_filename = os.path.join(folder, "~" + name + ".part")
+        self.header = False
+
+
+    def write(self, df):
+        raise NotImplementedError
+
+
+    # Finishes temporary file, subclasses save and close it here
+    def finish(self):
+        pass
+
+
+    def close(self):
+        self.finish()
+        os.replace(self.temp_filename, self.filename)
+
+
+    # Removes temporary file, target file is not changed
+    def abort(self):
+        try:
+            self.finish()
+        except Exception:
+            pass
+        if os.path.exists(self.temp_filename):
+            os.remove(self.temp_filename)
+
+
+    # Values of df with missing values changed to None, the same as to_excel writes empty cells for them
+    @staticmethod
+    def rows(df):
+        return df.astype(object).where(df.notna(), None).itertuples(index=False, name=None)
+
+
+# Format of dates in .xlsx files written by xlsxwriter, the same as pandas to_excel uses
+DATETIME_FORMAT = "yyyy-mm-dd hh:mm:ss"
+
+
+# Writes DataFrames one after another into write-only .xlsx workbook, header is taken from the first one
+# Rows are streamed to temporary file by openpyxl, workbook is complete after self.close
+class XlsxChunkWriter(ChunkWriter):
+
+    def __init__(self, filename):
+        super().__init__(filename)
+        import openpyxl
+        self.workbook = openpyxl.Workbook(write_only=True)
+        self.sheet = self.workbook.create_sheet()
+
+
+    def write(self, df):
+        if self.header is False:
+            self.sheet.append(list(map(str, df.columns)))
+            self.header = True
+        for row in self.rows(df):
+            self.sheet.append(row)
+
+
+    def finish(self):
+        if self.workbook is not None:
+            self.workbook.save(self.temp_filename)
+            self.workbook = None
+
+
+# Same as XlsxChunkWriter, but uses xlsxwriter which is several times faster than openpyxl
+# constant_memory mode writes every row to disk right after it's complete
+# Dates are written with DATETIME_FORMAT, otherwise xlsxwriter would leave them as plain numbers
+class XlsxwriterChunkWriter(ChunkWriter):
+
+    def __init__(self, filename):
+        super().__init__(filename)
+        import xlsxwriter
+        self.workbook = xlsxwriter.Workbook(self.temp_filename, {"constant_memory": True, "nan_inf_to_errors": True, "default_date_format": DATETIME_FORMAT})
+        self.sheet = self.workbook.add_worksheet()
+        self.row = 0
+
+
+    def write(self, df):
+        if self.header is False:
+            self.sheet.write_row(self.row, 0, list(map(str, df.columns)))
+            self.row += 1
+            self.header = True
+        for row in self.rows(df):
+            self.sheet.write_row(self.row, 0, row)
+            self.row += 1
+
+
+    def finish(self):
+        if self.workbook is not None:
+            self.workbook.close()
+            self.workbook = None
+
+
+# Appends DataFrames to .csv file
+class CsvChunkWriter(ChunkWriter):
+
+    def __init__(self, filename):
+        super().__init__(filename)
+        # Excel recognizes utf-8 with BOM, so polish characters are shown correctly
+        self.file = open(self.temp_filename, "w", encoding="utf-8-sig", newline="")
+
+
+    def write(self, df):
+        df.to_csv(self.file, header=not self.header, index=False, quoting=csv.QUOTE_MINIMAL)
+        self.header = True
+
+
+    def finish(self):
+        self.file.close()
+
+
+# Appends DataFrames as row groups of .parquet file, needs pyarrow
+# Schema is taken from the first chunk, text columns are always saved as strings
+# so chunks with only empty or only numeric values in them have the same schema
+class ParquetChunkWriter(ChunkWriter):
+
+    def __init__(self, filename):
+        super().__init__(filename)
+        import pyarrow
+        import pyarrow.parquet
+        self.pyarrow = pyarrow
+        self.writer = None
+
+
+    def write(self, df):
+        df = df.copy()
+        for column in df.columns[df.dtypes == object]:
+            df[column] = df[column].map(lambda value: None if pd.isna(value) else str(value)).astype("string")
+        if self.writer is None:
+            table = self.pyarrow.Table.from_pandas(df, preserve_index=False)
+            self.writer = self.pyarrow.parquet.ParquetWriter(self.temp_filename, table.schema)
+        else:
+            table = self.pyarrow.Table.from_pandas(df, schema=self.writer.schema, preserve_index=False)
+        self.writer.write_table(table)
+
+
+    def finish(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+
+# Supported formats of output files, their extensions are the same as names
+OUTPUT_FORMATS = ["xlsx", "csv", "parquet"]
+
+# xlsxwriter is used for .xlsx files if it is installed
+XLSX_WRITER = XlsxwriterChunkWriter if importlib.util.find_spec("xlsxwriter") else XlsxChunkWriter
+
+
+# Returns writer for output file, format is chosen by its extension
+def open_chunk_writer(filename):
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == ".csv":
+        return CsvChunkWriter(filename)
+    if extension == ".parquet":
+        return ParquetChunkWriter(filename)
+    return XLSX_WRITER(filename)
+
+
+# Writes whole DataFrame with the same writers as chunks
+def write_frame(df, filename):
+    writer = open_chunk_writer(filename)
+    try:
+        writer.write(df)
+        writer.close()
+    except Exception:
+        writer.abort()
+        raise
@@ -0,0 +1,27 @@
+import os
+import sys
+
+# Modules of the program are in the main folder of the repository
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from id_generator import IDGenerator
+
+
+# Returns function making IDGenerator for tests: match cache and logging of every matched laptop are off,
+# other settings are given by name, ex. make_generator(engine="vectorized", exact_matching=False)
+@pytest.fixture(scope="session")
+def make_generator():
+    def make(engine="loop", hdd_switch=False, workers=1, top_k=0, match_cache=0, **settings):
+        generator = IDGenerator()
+        generator.set_match_engine(engine)
+        generator.toggle_hdd_switch(hdd_switch)
+        generator.set_workers(workers)
+        generator.set_top_k(top_k)
+        generator.set_match_cache(match_cache)
+        generator.set_log_rows(False)
+        for name, value in settings.items():
+            setattr(generator, name, value)
+        return generator
+    return make
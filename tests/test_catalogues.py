@@ -0,0 +1,72 @@
+import pytest
+
+from benchmark import generate_catalogue, generate_report
+
+
+# Report matched with two ID files at once gets the same ID's as with one file made of both,
+# 'Katalog' has name of file of every found ID in the same order
+@pytest.mark.parametrize("group_catalogue", [True, False])
+def test_merged_catalogues_match_like_one_file(tmp_path, make_generator, group_catalogue):
+    dfRaw, laptops = generate_catalogue(1000)
+    dfInput = generate_report(200, laptops)
+    dfID = make_generator().clean_ID(dfRaw)
+    dfID.iloc[:500].to_csv(tmp_path / "wawa.csv", index=False)
+    dfID.iloc[500:].to_csv(tmp_path / "krakow.csv", index=False)
+    dfOutput, _ = make_generator(group_catalogue=group_catalogue).match_ID(dfInput.copy(), dfID)
+
+    merged = make_generator(group_catalogue=group_catalogue)
+    merged.load_ID(f"{tmp_path / 'wawa.csv'}; {tmp_path / 'krakow.csv'}")
+    dfMerged, _ = merged.match_ID(dfInput.copy(), merged.dfID)
+
+    assert list(dfMerged['Znalezione ID']) == list(dfOutput['Znalezione ID'])
+    wawa = set(dfID['ID'].iloc[:500].astype(str))
+    for found, catalogues in zip(dfMerged['Znalezione ID'], dfMerged['Katalog']):
+        if found == 'brak':
+            assert catalogues == ""
+            continue
+        IDs = found.removeprefix("Najbliższe: ").split(", ")
+        assert catalogues == ", ".join(("wawa" if ID in wawa else "krakow") + ": " + ID for ID in IDs)
+
+
+# ID found in both files keeps its value, 'Katalog' tells which of the files it was found in
+@pytest.mark.parametrize("group_catalogue", [True, False])
+def test_shared_ids_keep_value(tmp_path, make_generator, group_catalogue):
+    dfRaw, laptops = generate_catalogue(300)
+    dfInput = generate_report(100, laptops)
+    dfID = make_generator().clean_ID(dfRaw)
+    dfID.to_csv(tmp_path / "wawa.csv", index=False)
+    dfID.head(100).to_csv(tmp_path / "krakow.csv", index=False)
+    dfOutput, _ = make_generator(group_catalogue=group_catalogue).match_ID(dfInput.copy(), dfID)
+
+    merged = make_generator(group_catalogue=group_catalogue)
+    merged.load_ID([str(tmp_path / "wawa.csv"), str(tmp_path / "krakow.csv")])
+    assert merged.dfID['ID'].astype(str).tolist() == dfID['ID'].astype(str).tolist() + dfID['ID'].astype(str).head(100).tolist()
+    dfMerged, _ = merged.match_ID(dfInput.copy(), merged.dfID)
+
+    shared = set(dfID['ID'].head(100).astype(str))
+    found_shared = False
+    for found, merged_found, catalogues in zip(dfOutput['Znalezione ID'], dfMerged['Znalezione ID'], dfMerged['Katalog']):
+        if found == 'brak':
+            assert merged_found == 'brak' and catalogues == ""
+            continue
+        IDs = found.removeprefix("Najbliższe: ").split(", ")
+        # ID of both files is found in both of them, rows of 'krakow' come after rows of 'wawa'
+        again = [ID for ID in IDs if ID in shared]
+        assert merged_found.removeprefix("Najbliższe: ").split(", ") == IDs + again
+        assert catalogues == ", ".join([f"wawa: {ID}" for ID in IDs] + [f"krakow: {ID}" for ID in again])
+        found_shared |= any(ID in shared for ID in IDs)
+    assert found_shared
+
+
+# Cleaned files with different columns are merged, ex. compact .csv and .pkl saved with all columns of cleaned file
+def test_catalogues_with_different_columns(tmp_path, make_generator):
+    dfRaw, _ = generate_catalogue(300)
+    dfFull = make_generator(compact_catalogue=False).clean_ID(dfRaw).assign(Uwagi="-")
+    dfFull.iloc[:150].to_csv(tmp_path / "wawa.csv", index=False)
+    dfFull.iloc[150:].to_pickle(tmp_path / "krakow.pkl")
+
+    merged = make_generator()
+    merged.load_ID([str(tmp_path / "wawa.csv"), str(tmp_path / "krakow.pkl")])
+    assert merged.dfID['ID'].astype(str).tolist() == dfFull['ID'].astype(str).tolist()
+    assert merged.dfID['Katalog'].tolist() == ["wawa"] * 150 + ["krakow"] * (len(dfFull) - 150)
+    assert merged.dfID['Uwagi'].isna().sum() == 150
@@ -0,0 +1,79 @@
+import pandas as pd
+import pytest
+
+from benchmark import generate_catalogue, generate_report
+from checkpoint import Checkpoint, BAD_ROW
+
+
+@pytest.fixture(scope="module")
+def catalogue(make_generator):
+    dfRaw, laptops = generate_catalogue(1500)
+    return make_generator().clean_ID(dfRaw), generate_report(250, laptops)
+
+
+# Interrupted report is resumed from checkpoint, only rows that weren't saved are matched again
+@pytest.mark.parametrize("engine", ["loop", "vectorized"])
+def test_resumed_report_matches_only_missing_rows(tmp_path, catalogue, make_generator, engine):
+    dfID, dfInput = catalogue
+    filename = str(tmp_path / "~raport_znalezione.xlsx.checkpoint")
+    dfExpected, expected_found = make_generator(engine).match_ID(dfInput.copy(), dfID)
+
+    interrupted = make_generator(engine)
+    match_rows_exact = interrupted.match_rows_exact
+    parts = []
+
+    def stop_after_first_part(dfPart, *args, **kwargs):
+        if parts:
+            raise KeyboardInterrupt
+        parts.append(len(dfPart))
+        return match_rows_exact(dfPart, *args, **kwargs)
+
+    interrupted.match_rows_exact = stop_after_first_part
+    with pytest.raises(KeyboardInterrupt):
+        interrupted.match_ID(dfInput.copy(), dfID, checkpoint=Checkpoint(filename, "key", 100))
+    assert parts == [100]
+
+    checkpoint = Checkpoint(filename, "key", 100)
+    assert checkpoint.load() and len(checkpoint.results) == 100
+    resumed = make_generator(engine)
+    dfOutput, found = resumed.match_ID(dfInput.copy(), dfID, checkpoint=checkpoint)
+    rows = len(dfExpected)
+    assert resumed.stats.counters["restored_rows"] == 100
+    assert resumed.stats.counters.get("exact_rows", 0) + resumed.stats.counters["scored_rows"] == rows - 100
+    pd.testing.assert_frame_equal(dfOutput, dfExpected)
+    assert found == expected_found
+
+    # Checkpoint of different report or settings is not used
+    assert not Checkpoint(filename, "other key", 100).load()
+
+
+# Laptop that can't be matched gets BAD_ROW when checkpoint is used, the rest of its part is matched as usual
+@pytest.mark.parametrize("engine", ["loop", "vectorized"])
+def test_bad_row_is_skipped_with_checkpoint(tmp_path, catalogue, make_generator, engine):
+    dfID, dfInput = catalogue
+    dfInput = dfInput.dropna(subset=['Model']).reset_index(drop=True)
+    dfBroken = dfInput.copy()
+    dfBroken.loc[30, 'Docelowa'] = "brak"
+
+    error, _ = make_generator(engine).match_ID(dfBroken.copy(), dfID)
+    assert isinstance(error, Exception)
+
+    matcher = make_generator(engine)
+    dfOutput, found = matcher.match_ID(dfBroken.copy(), dfID, checkpoint=Checkpoint(str(tmp_path / "checkpoint"), "key", 100))
+    dfExpected, expected_found = make_generator(engine).match_ID(dfInput.drop(index=30), dfID)
+    assert dfOutput.loc[30, 'Znalezione ID'] == BAD_ROW
+    assert matcher.stats.counters["bad_rows"] == 1
+    assert dfOutput['Znalezione ID'].drop(index=30).tolist() == dfExpected['Znalezione ID'].tolist()
+    assert found == expected_found
+
+
+# Report without some of the columns returns the error like without checkpoint, its laptops are not skipped one by one
+@pytest.mark.parametrize("column", ['Grafika', 'S/N'])
+def test_missing_column_returns_error_with_checkpoint(tmp_path, catalogue, make_generator, column):
+    dfID, dfInput = catalogue
+    checkpoint = Checkpoint(str(tmp_path / "checkpoint"), "key", 100)
+    matcher = make_generator()
+    error, found = matcher.match_ID(dfInput.drop(columns=[column]), dfID, checkpoint=checkpoint)
+    assert isinstance(error, KeyError) and found is error
+    assert error.args == (column,)
+    assert "bad_rows" not in matcher.stats.counters and not checkpoint.results
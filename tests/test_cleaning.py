@@ -0,0 +1,73 @@
+import pandas as pd
+import pytest
+
+from benchmark import generate_catalogue
+
+
+# Names with errors of the real M2 M47 file handled by IDGenerator.extract_specs and IDGenerator.format_specs
+QUIRKS = [
+    # Processor moved into model, 'generacji' shift
+    'Laptop Lenovo ThinkPad T480 i5 - 8 generacji / 8GB / BRAK DYSKU / 14" FHD / W11P / Klasa A',
+    'Laptop ThinkPad T470 i7 - 7 generacji / 16GB / 256GB SSD / GeForce MX150 / 14" FHD / Klasa B',
+    # Missing manufacturer, ThinkPad and EliteBook prefixes
+    'Laptop ThinkPad T480 / i5-8350U / 16GB / BRAK DYSKU / 14" FHD / W11P / Klasa A',
+    'Laptop EliteBook 840 G5 / i5-8250U / 8GB / 256GB SSD / 14" FHD dotyk / W11H / Klasa A-',
+    'Laptop Yoga 370 / i5-7300U / 8GB / BRAK DYSKU / 13.3" FullHD dotyk / Win11Pro / Klasa B',
+    # Missing processor, RAM in its place is blanked
+    'Laptop HP ProBook 640 G4 / 8GB / 256GB SSD / 14" HD / W11P / Klasa C',
+    # Short names
+    'Laptop Dell Latitude 5490 / i5-8350U',
+    'Laptop Lenovo ThinkPad / i5 / 8GB / 128GB / W11P dotyk',
+    'Laptop Dell Latitude 7490 / i7-8650U / 16GB / 512GB SSD',
+    # Docking stations are removed
+    'Stacja dokująca Lenovo ThinkPad USB-C Dock / 90W',
+    'Laptop Stacja Dokująca Dell WD19 / 130W / - / -',
+]
+
+
+def raw_date(names, first_id=1):
+    return pd.DataFrame({
+        'ID': [float(first_id + i) for i in range(len(names))],
+        'Producent': ["-"] * len(names),
+        'Pełna nazwa': names,
+        'Stan': [1] * len(names),
+    })
+
+
+@pytest.fixture(scope="module")
+def generator(make_generator):
+    return make_generator()
+
+
+# Vectorized cleaning has to give the same dfID as cleaning row by row
+@pytest.mark.parametrize("compact", [True, False])
+def test_vectorized_cleaning_matches_rows(generator, compact):
+    generator.compact_catalogue = compact
+    dfCatalogue, _ = generate_catalogue(1000)
+    df = pd.concat([raw_date(QUIRKS), dfCatalogue], ignore_index=True)
+    vectorized = generator.clean_ID(df.copy(), vectorized=True)
+    rows = generator.clean_ID(df.copy(), vectorized=False)
+    pd.testing.assert_frame_equal(vectorized, rows)
+    assert set(vectorized['ID'].astype(str)) >= {'1', '2', '3', '4', '5', '8', '9'}
+
+
+# extract_specs can't split empty and one-word names, vectorized cleaning drops them and cleans the rest the same way
+def test_vectorized_cleaning_drops_empty_names(generator):
+    generator.compact_catalogue = True
+    df = raw_date(QUIRKS)
+    broken = raw_date(["", "Laptop", None], first_id=100)
+    vectorized = generator.clean_ID(pd.concat([df, broken], ignore_index=True), vectorized=True)
+    rows = generator.clean_ID(df.copy(), vectorized=False)
+    pd.testing.assert_frame_equal(vectorized, rows)
+    with pytest.raises(IndexError):
+        generator.clean_ID(broken.iloc[:2].copy(), vectorized=False)
+
+
+# Compact dfID keeps ID's that wouldn't be written the same way as numbers
+def test_compact_catalogue_keeps_text_ids(generator):
+    df = raw_date(QUIRKS[:3])
+    df['ID'] = ['00123', '1e3', '7']
+    generator.compact_catalogue = True
+    compact = generator.clean_ID(df.copy())
+    generator.compact_catalogue = False
+    assert compact['ID'].tolist() == generator.clean_ID(df.copy())['ID'].tolist() == ['00123', '1e3', '7']
@@ -0,0 +1,85 @@
+import pandas as pd
+import pytest
+
+from benchmark import generate_catalogue
+from match_rules import MatchRules
+
+
+@pytest.fixture(scope="module")
+def versions():
+    dfRaw, _ = generate_catalogue(1500)
+    dfOld = dfRaw.iloc[:1000].reset_index(drop=True)
+    # Next version of the file: rows deleted, changed and added, like read_excel gives it
+    dfNew = dfOld.drop(index=range(100, 150)).copy()
+    dfNew.loc[300:320, 'Pełna nazwa'] = dfRaw['Pełna nazwa'].iloc[1000:1021].to_numpy()
+    dfNew = pd.concat([dfNew.iloc[:500], dfRaw.iloc[1100:1300], dfNew.iloc[500:]]).reset_index(drop=True)
+    return dfOld, dfNew
+
+
+# Cleaning only changed rows gives the same dfID as cleaning the whole file, with the same index and order of rows
+@pytest.mark.parametrize("compact", [True, False])
+def test_incremental_cleaning_equals_full_cleaning(versions, make_generator, compact):
+    dfOld, dfNew = versions
+    cleaner = make_generator(compact_catalogue=compact)
+    dfPrevious = cleaner.clean_ID(dfOld.copy())
+    snapshot = cleaner.ID_snapshot(dfOld, dfPrevious)
+
+    dfID, new_snapshot, previous_positions = cleaner.clean_ID_incremental(dfNew.copy(), dfPrevious, snapshot)
+    dfFull = cleaner.clean_ID(dfNew.copy())
+    pd.testing.assert_frame_equal(dfID, dfFull)
+    pd.testing.assert_series_equal(new_snapshot, cleaner.ID_snapshot(dfNew, dfFull))
+
+    # Rows copied from previous version point to the same ID's, the rest is new
+    kept = previous_positions >= 0
+    assert 0 < kept.sum() < len(dfID)
+    assert (dfPrevious['ID'].to_numpy()[previous_positions[kept]] == dfID['ID'].to_numpy()[kept]).all()
+
+
+# Snapshot of file cleaned with different rules is not used, the next version is cleaned whole
+def test_snapshot_of_other_rules_is_ignored(versions, make_generator, tmp_path):
+    dfOld, dfNew = versions
+    old = make_generator()
+    old.cache_dir = str(tmp_path)
+    dfPrevious = old.clean_ID(dfOld.copy())
+    old.write_cached_ID(dfPrevious, "local_file", "1", old.ID_snapshot(dfOld, dfPrevious))
+    assert old.read_cached_snapshot("local_file") is not None
+
+    new = make_generator()
+    new.cache_dir = str(tmp_path)
+    new.rules = MatchRules({"docking_keyword": "stacja"})
+    assert new.read_cached_snapshot("local_file") is None
+    assert new.previous_ID("local_file") is None
+
+    new.dfID = dfNew.copy()
+    new.fID_file_id = "local_file"
+    new.fID_version = "2"
+    new.fID_cleaned = False
+    new.prepare_ID()
+    pd.testing.assert_frame_equal(new.dfID, new.clean_ID(dfNew.copy()))
+
+
+# Cached cleaned ID file is used only with the rules it was cleaned with, changed rules clean the same file again
+def test_cached_file_of_other_rules_is_ignored(versions, make_generator, tmp_path):
+    dfOld, _ = versions
+    filename = str(tmp_path / "raw.xlsx")
+    dfOld.to_excel(filename, sheet_name='Raw Date', index=False)
+
+    old = make_generator()
+    old.cache_dir = str(tmp_path / "cache")
+    old.load_ID(filename)
+    old.prepare_ID()
+    same = make_generator()
+    same.cache_dir = old.cache_dir
+    same.load_ID(filename)
+    assert same.fID_cleaned is True
+
+    new = make_generator()
+    new.cache_dir = old.cache_dir
+    new.rules = MatchRules({"gpu_keywords": ["Quadro"]})
+    assert new.cached_ID_version(old.fID_file_id) is None
+    assert new.read_cached_ID(old.fID_file_id, None) is None
+    new.load_ID(filename)
+    assert new.fID_cleaned is False
+    new.prepare_ID()
+    pd.testing.assert_frame_equal(new.dfID, new.clean_ID(pd.read_excel(filename, sheet_name='Raw Date')))
+    assert not new.dfID.equals(old.dfID)
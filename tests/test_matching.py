@@ -0,0 +1,94 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pytest
+
+from benchmark import generate_catalogue, generate_report
+
+
+@pytest.fixture(scope="module")
+def catalogue():
+    dfRaw, laptops = generate_catalogue(1500)
+    return dfRaw, generate_report(300, laptops)
+
+
+def match(generator, dfRaw, dfInput):
+    dfID = generator.clean_ID(dfRaw.copy())
+    dfOutput, matches_found = generator.match_ID(dfInput.copy(), dfID)
+    return list(dfOutput['Znalezione ID']), matches_found
+
+
+# Vectorized engine has to find the same ID's as the loop of IDGenerator.match_one
+@pytest.mark.parametrize("hdd_switch", [False, True])
+def test_vectorized_engine_matches_loop(catalogue, make_generator, hdd_switch):
+    dfRaw, dfInput = catalogue
+    loop = match(make_generator("loop", hdd_switch), dfRaw, dfInput)
+    vectorized = match(make_generator("vectorized", hdd_switch), dfRaw, dfInput)
+    assert vectorized == loop
+    assert loop[1] > 0
+
+
+# Top-K columns found while matching have to be the k best rows of brute-force scoring of every ID,
+# sorted by number of matched values and by order of dfID
+@pytest.mark.parametrize("engine", ["loop", "vectorized"])
+@pytest.mark.parametrize("workers", [1, 2])
+def test_top_matches_equal_sorted_scores(catalogue, make_generator, engine, workers):
+    dfRaw, dfInput = catalogue
+    k = 5
+    generator = make_generator(engine, workers=workers, top_k=k, match_cache=50000)
+    dfID = generator.clean_ID(dfRaw.copy())
+    dfOutput, _ = generator.match_ID(dfInput.copy(), dfID)
+
+    brute = make_generator(group_catalogue=False)
+    positions = {ID: position for position, ID in enumerate(dfID['ID'].astype(str))}
+    for _, row in dfOutput.iterrows():
+        matched = brute.match_one(row, dfID) or []
+        best = sorted(matched, key=lambda match: (-match[1], positions[str(match[0])]))[:k]
+        for place in range(1, k + 1):
+            if place <= len(best):
+                assert row[f"ID {place}"] == str(best[place - 1][0])
+                assert row[f"Zgodność {place}"] == best[place - 1][1]
+            else:
+                assert pd.isna(row[f"ID {place}"])
+
+
+# Perfect matches found at once by ExactMatcher give the same 'Znalezione ID' as scoring every laptop
+@pytest.mark.parametrize("engine", ["loop", "vectorized"])
+@pytest.mark.parametrize("hdd_switch", [False, True])
+def test_exact_matching_finds_the_same_ids(catalogue, make_generator, engine, hdd_switch):
+    dfRaw, dfInput = catalogue
+    results = []
+    for exact_matching in [True, False]:
+        generator = make_generator(engine, hdd_switch, exact_matching=exact_matching)
+        dfID = generator.clean_ID(dfRaw.copy())
+        dfOutput, matches_found = generator.match_ID(dfInput.copy(), dfID)
+        results.append((list(dfOutput['Znalezione ID']), matches_found, generator.stats.counters.get("exact_rows", 0)))
+    assert results[0][:2] == results[1][:2]
+    assert results[0][2] > 0 and results[1][2] == 0
+
+
+# Report without some of the columns fails the same way with and without ExactMatcher
+@pytest.mark.parametrize("engine", ["loop", "vectorized"])
+def test_exact_matching_leaves_missing_columns_to_scoring(catalogue, make_generator, engine):
+    dfRaw, dfInput = catalogue
+    errors = []
+    for exact_matching in [True, False]:
+        generator = make_generator(engine, exact_matching=exact_matching)
+        dfID = generator.clean_ID(dfRaw.copy())
+        dfOutput, matches_found = generator.match_ID(dfInput.drop(columns=['Grafika']), dfID)
+        assert isinstance(dfOutput, KeyError) and matches_found is dfOutput
+        errors.append(repr(dfOutput))
+    assert errors[0] == errors[1]
+
+
+# Worker processes started next to other threads (ex. from GUI or pipeline) are spawned instead of forked
+def test_parallel_matching_from_thread(catalogue, make_generator):
+    dfRaw, dfInput = catalogue
+    expected = match(make_generator("vectorized"), dfRaw, dfInput)
+    generator = make_generator("vectorized", workers=2)
+    dfID = generator.clean_ID(dfRaw.copy())
+    with ThreadPoolExecutor(max_workers=1) as thread:
+        with thread.submit(generator.match_pool, dfID).result() as executor:
+            assert executor._mp_context.get_start_method() == "spawn"
+        dfOutput, matches_found = thread.submit(generator.match_ID, dfInput.copy(), dfID).result()
+    assert (list(dfOutput['Znalezione ID']), matches_found) == expected
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmark import generate_catalogue, generate_report
+from catalogue_index import CatalogueIndex
+from match_rules import MatchRules
+from model_index import ModelIndex
+
+
+MODELS = ['thinkpad t480', 'thinkpad t480s', 'thinkpad t470', 'probook 840 g5', 'elitebook 840 g5', 'elitebook 840 g5 silver', 'thinkpad x1 carbon']
+
+
+def dfID(models):
+    return pd.DataFrame({
+        'ID': [str(100000 + i) for i in range(len(models))],
+        'Manufacturer': ['Lenovo'] * len(models),
+        'Model': models,
+        'Processor': ['i5-8350U'] * len(models),
+        'RAM': ['8GB'] * len(models),
+        'HDD': ['BRAK DYSKU'] * len(models),
+        'Graphics': ['-'] * len(models),
+        'Resolution': ['14" FHD'] * len(models),
+        'Touchscreen': ['No'] * len(models),
+        'Windows': ['W11P'] * len(models),
+        'Class': ['A'] * len(models),
+    })
+
+
+def found(model, rules=None):
+    index = ModelIndex(MODELS, rules or MatchRules())
+    return [MODELS[position] for position in index.lookup(model)]
+
+
+# Models are matched by whole words, variants of a model are different models
+@pytest.mark.parametrize("model, expected", [
+    ('t480', ['thinkpad t480']),
+    ('thinkpad t480s', ['thinkpad t480s']),
+    ('840 g5', ['probook 840 g5', 'elitebook 840 g5']),
+    ('840 g5 silver', ['elitebook 840 g5 silver']),
+    ('x1', ['thinkpad x1 carbon']),
+    ('t48', []),
+])
+def test_model_index_matches_whole_words(model, expected):
+    assert found(model) == expected
+
+
+@pytest.mark.parametrize("grouped", [True, False])
+def test_catalogue_index_matches_models_by_words(grouped):
+    index = CatalogueIndex(dfID(MODELS), MatchRules(), grouped=grouped)
+    assert index.matches('model', 't480', 'thinkpad t480')
+    assert not index.matches('model', 't480', 'thinkpad t480s')
+    assert index.matches('model', '840 g5', 'elitebook 840 g5')
+    assert not index.matches('model', '840 g5', 'elitebook 840 g5 silver')
+    assert index.matches('processor', 'i5', 'i5-8350u')
+
+
+# "model_matching": "substring" finds the same candidates as the old check 'model in value' of every row
+def test_substring_rules_match_like_before(make_generator):
+    rules = MatchRules({"model_matching": "substring"})
+    index = CatalogueIndex(dfID(MODELS), rules)
+    assert index.matches('model', 't480', 'thinkpad t480s')
+    assert index.matches('model', '840 g5', 'elitebook 840 g5 silver')
+
+    dfRaw, laptops = generate_catalogue(1000)
+    dfCatalogue = make_generator(rules=rules).clean_ID(dfRaw)
+    index = CatalogueIndex(dfCatalogue, rules)
+    normalized = index.normalized
+    for _, row in generate_report(200, laptops).dropna(subset=['Model']).iterrows():
+        keys = rules.normalize_input_keys(row)
+        expected = [position for position, values in enumerate(zip(normalized['manufacturer'], normalized['model'], normalized['processor']))
+                    if all(key in value for key, value in zip(keys, values))]
+        assert np.array_equal(index.candidates(keys), expected)
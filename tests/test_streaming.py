@@ -0,0 +1,57 @@
+import os
+
+import pandas as pd
+import pytest
+
+from streaming import XlsxChunkWriter, XlsxwriterChunkWriter, CsvChunkWriter, write_frame
+
+
+def report():
+    return pd.DataFrame({
+        'Lp.': [1, 2, 3],
+        'Data': pd.to_datetime(["2025-01-02 10:00:00", None, "2025-03-04 00:00:00"]),
+        'Znalezione ID': ["100102", "brak", None],
+    })
+
+
+# Dates of input reports are written to .xlsx as dates, not as numbers
+@pytest.mark.parametrize("writer_class", [XlsxChunkWriter, XlsxwriterChunkWriter])
+def test_xlsx_keeps_dates(tmp_path, writer_class):
+    filename = str(tmp_path / "report_znalezione.xlsx")
+    df = report()
+    writer = writer_class(filename)
+    writer.write(df.iloc[:2])
+    writer.write(df.iloc[2:])
+    writer.close()
+
+    written = pd.read_excel(filename)
+    assert pd.api.types.is_datetime64_any_dtype(written['Data'])
+    pd.testing.assert_series_equal(written['Data'], df['Data'], check_dtype=False)
+    assert written['Znalezione ID'].tolist()[:2] == ["100102", "brak"]
+
+
+# Output file is replaced only when it's complete, temporary file is removed in both cases
+@pytest.mark.parametrize("extension", ["xlsx", "csv"])
+def test_output_replaced_only_when_complete(tmp_path, extension):
+    filename = str(tmp_path / f"report_znalezione.{extension}")
+    write_frame(report(), filename)
+    with open(filename, "rb") as file:
+        complete = file.read()
+
+    class Broken:
+        def __str__(self):
+            raise ValueError("broken value")
+
+    with pytest.raises(Exception):
+        write_frame(pd.DataFrame({'Lp.': [1], 'Znalezione ID': [Broken()]}), filename)
+    with open(filename, "rb") as file:
+        assert file.read() == complete
+    assert os.listdir(tmp_path) == [os.path.basename(filename)]
+
+
+def test_aborted_writer_leaves_no_file(tmp_path):
+    filename = str(tmp_path / "report_znalezione.csv")
+    writer = CsvChunkWriter(filename)
+    writer.write(report())
+    writer.abort()
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+
+
+# Alternative to IDGenerator.match_one which scores one laptop against entire cleaned ID file at once
+# Values normalized by MatchRules.normalize_catalogue are factorized only once,
+# so every comparison is a lookup in array of distinct values followed by numpy operations
+class VectorizedMatcher:
+
+    # Normalized columns searched for values of input laptop
+    TEXT_KEYS = ['manufacturer', 'model', 'processor', 'graphics', 'resolution', 'touchscreen']
+
+    def __init__(self, index):
+        # Matcher is valid only for dfID of given CatalogueIndex, IDGenerator rebuilds it when dfID changes
+        self.dfID = index.dfID
+        self.index = index
+        normalized = index.normalized
+        self.ids = normalized['ID'].to_numpy()
+
+        # {column: (codes of rows, distinct values)}
+        self.factorized = {}
+        # {column: {searched value: boolean array for distinct values containing it}}
+        self.lookups = {}
+        for column in self.TEXT_KEYS:
+            codes, uniques = pd.factorize(normalized[column])
+            self.factorized[column] = (codes, list(uniques))
+            self.lookups[column] = {}
+
+        # Class is compared for equality, so map every distinct value to its code
+        codes, uniques = pd.factorize(normalized['lap_class'])
+        self.class_codes = codes
+        self.class_lookup = {value: code for code, value in enumerate(uniques)}
+
+        self.ram = normalized['ram'].to_numpy()
+        self.hdd = normalized['hdd'].to_numpy()
+        self.hdd_missing = normalized['hdd_missing'].to_numpy(dtype=bool)
+
+        # {canonical token: boolean array of rows with that token}
+        self.resolution_tokens = self.token_masks(normalized['resolution_tokens'])
+        self.windows_tokens = self.token_masks(normalized['windows_tokens'])
+
+
+    @staticmethod
+    def token_masks(column):
+        codes, uniques = pd.factorize(column)
+        tokens = set().union(*uniques) if len(uniques) else set()
+        return {token: np.array([token in unique for unique in uniques], dtype=bool)[codes] for token in tokens}
+
+
+    # Returns boolean array of rows where searched value is contained in given column
+    # Models are matched the same way as by CatalogueIndex, see CatalogueIndex.matches
+    def contains(self, column, value):
+        codes, uniques = self.factorized[column]
+        hits = self.lookups[column].get(value)
+        if hits is None:
+            if column == 'model':
+                hits = np.array([self.index.matches(column, value, unique) for unique in uniques] + [False], dtype=bool)
+            else:
+                hits = np.array([value in unique for unique in uniques] + [False], dtype=bool)
+            self.lookups[column][value] = hits
+        return hits[codes]
+
+
+    # Returns boolean array of selected rows sharing at least one canonical token with input value
+    @staticmethod
+    def shares_token(masks, tokens, selected):
+        found = np.zeros(len(selected), dtype=bool)
+        for token in tokens:
+            if token in masks:
+                found |= masks[token][selected]
+        return found
+
+
+    # Scores given laptop against every row, returns list of tuples with the same structure as IDGenerator.match_one
+    # Takes MatchRules used to build the index, raises the same errors as match_one would for wrong input values
+    # If Instrumentation is given, number of scored candidates is added to it
+    def match(self, input_row, rules, hdd_switch, stats=None):
+        manufacturer, model, processor = rules.normalize_input_keys(input_row)
+        m_manufacturer = self.contains('manufacturer', manufacturer)
+        m_model = self.contains('model', model)
+        m_processor = self.contains('processor', processor)
+
+        # If Manufacturer, Model and Processor are not matched there is no point of checking other things
+        selected = np.flatnonzero(m_manufacturer & m_model & m_processor)
+        if stats is not None:
+            stats.count('candidates', len(selected))
+        if len(selected) == 0:
+            return None
+
+        specs = rules.normalize_input_specs(input_row)
+
+        if hdd_switch is False:
+            m_hdd = self.hdd_missing[selected]
+        elif hdd_switch is True:
+            m_hdd = (self.hdd[selected] == specs.hdd) | self.hdd_missing[selected]
+        else:
+            m_hdd = np.zeros(len(selected), dtype=bool)
+
+        m_ram = self.ram[selected] == specs.ram
+        m_gpu = self.contains('graphics', specs.graphics)[selected]
+        m_resolution = self.contains('resolution', specs.display)[selected] | self.shares_token(self.resolution_tokens, specs.resolution_tokens, selected)
+        m_touchscreen = self.contains('touchscreen', specs.touchscreen)[selected]
+        m_windows = self.shares_token(self.windows_tokens, specs.windows_tokens, selected)
+        m_lap_class = self.class_codes[selected] == self.class_lookup.get(specs.lap_class, -2)
+
+        flags = [np.ones(len(selected), dtype=bool)] * 3 + [m_ram, m_hdd, m_gpu, m_resolution, m_touchscreen, m_windows, m_lap_class]
+        count = np.sum(flags, axis=0)
+
+        # If less than that is matched then laptop is to different to even show it
+        keep = count > 6
+        if not keep.any():
+            return None
+
+        return self.index.expand(list(zip(self.ids[selected][keep].tolist(), count[keep].tolist(), *(flag[keep].tolist() for flag in flags))))